@@ -1,3 +1,14 @@
-from curadoria_coletiva.app import app
+__all__ = ["app"]
 
-__all__ = [app]
+
+def __getattr__(name):
+    # The Dash app is only imported when asked for, so scripts that import other
+    # modules of the package (validation, link checking) don't load Dash and pandas.
+    if name == "app":
+        from curadoria_coletiva.app import app
+
+        # Importing the submodule binds its name to the module; point it back to the
+        # Dash app, as before.
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,202 @@
+import base64
+import hashlib
+import json
+
+from flask import Response, jsonify, request
+
+from curadoria_coletiva.collection_registry import CatalogTooLargeError
+from curadoria_coletiva.material_filters import SORTABLE_FIELDS
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Query parameter of each multi-valued filter. Values can be repeated
+# (`?formato=vídeo&formato=livro`) or comma-separated (`?formato=vídeo,livro`).
+_FILTER_PARAMS = {
+    "assunto": "selected_subject",
+    "formato": "selected_format",
+    "estilo_aprendizagem": "selected_learning_style",
+    "idioma": "selected_language",
+    "nivel_dificuldade": "selected_level",
+}
+
+
+class _BadRequest(ValueError):
+    pass
+
+
+def register_api_routes(server, registry, default_collection):
+    """Registers the read-only JSON API on the Flask server of the Dash app.
+
+    - `GET /api/materials`: a page of materials, with the same filters and sorting of
+      the search page, plus `fields` projection and cursor pagination.
+    - `GET /api/materials.ndjson`: all matching materials, one JSON object per line,
+      streamed without building the whole response in memory.
+
+    Both are served for the default collection and, under `/api/colecoes/<collection>`
+    (e.g. `/api/colecoes/<collection>/materials`), for every collection of the
+    registry. The pages of each collection are under `/colecoes/<collection>/`, which
+    its Dash app claims entirely, so the API cannot live there.
+
+    Responses carry an ETag derived from the catalog version and the query, so clients
+    can revalidate with `If-None-Match` and get a `304 Not Modified` without the
+    catalog being searched. Cursors are tied to the catalog version too: a cursor from
+    an older version is refused, as the page it points to may have moved.
+
+    A catalog refused for not fitting in the memory budget of the registry is answered
+    with a `503 Service Unavailable` and a JSON error, by the API as well as by the
+    callbacks of the search pages, which share the Flask server.
+    """
+
+    @server.errorhandler(CatalogTooLargeError)
+    def catalog_too_large(e):
+        return jsonify({"error": str(e)}), 503
+
+    @server.route("/api/materials")
+    @server.route("/api/colecoes/<collection>/materials")
+    def api_materials(collection=default_collection):
+        if collection not in registry:
+            return jsonify({"error": f"Unknown collection: {collection}"}), 404
+        catalog = registry.get(collection)
+
+        try:
+            search_arguments, fields = _query(catalog)
+            limit = _page_size()
+            offset = _offset(catalog.version)
+        except _BadRequest as e:
+            return jsonify({"error": str(e)}), 400
+
+        etag = _etag(catalog.version)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+        filtered_df = catalog.search(**search_arguments)
+        page_df = filtered_df.iloc[offset : offset + limit]
+        next_offset = offset + limit
+        response = jsonify(
+            {
+                "total": len(filtered_df),
+                "items": _records(page_df, fields),
+                "next_cursor": (
+                    _encode_cursor(catalog.version, next_offset)
+                    if next_offset < len(filtered_df)
+                    else None
+                ),
+            }
+        )
+        response.set_etag(etag)
+        return response
+
+    @server.route("/api/materials.ndjson")
+    @server.route("/api/colecoes/<collection>/materials.ndjson")
+    def api_materials_ndjson(collection=default_collection):
+        if collection not in registry:
+            return jsonify({"error": f"Unknown collection: {collection}"}), 404
+        catalog = registry.get(collection)
+
+        try:
+            search_arguments, fields = _query(catalog)
+        except _BadRequest as e:
+            return jsonify({"error": str(e)}), 400
+
+        etag = _etag(catalog.version)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+        filtered_df = catalog.search(**search_arguments)
+
+        def generate():
+            for start in range(0, len(filtered_df), MAX_PAGE_SIZE):
+                chunk = filtered_df.iloc[start : start + MAX_PAGE_SIZE]
+                for material in _records(chunk, fields):
+                    yield json.dumps(material, ensure_ascii=False) + "\n"
+
+        response = Response(generate(), mimetype="application/x-ndjson")
+        response.set_etag(etag)
+        return response
+
+
+def _query(catalog):
+    """Reads the filters and sorting of the request, as the search page applies them,
+    and returns the arguments of `catalog.search` along with the fields to return."""
+    filters = {
+        argument: _list_param(param) for param, argument in _FILTER_PARAMS.items()
+    }
+
+    sort_column = request.args.get("ordenar")
+    if sort_column and sort_column not in SORTABLE_FIELDS:
+        raise _BadRequest(f"Unknown sort field: {sort_column}")
+
+    fields = _list_param("fields") or catalog.fields
+    unknown_fields = [field for field in fields if field not in catalog.fields]
+    if unknown_fields:
+        raise _BadRequest(f"Unknown fields: {', '.join(unknown_fields)}")
+
+    search_arguments = dict(
+        search_term=request.args.get("q"),
+        free_filter=request.args.get("gratuito", "").lower() in ("1", "true", "sim"),
+        sort_column=sort_column,
+        **filters,
+    )
+    return search_arguments, fields
+
+
+def _records(df, fields):
+    """Returns the given fields of the materials as dicts. Missing values, which pandas
+    keeps as NaN, become None: JSON has null but no NaN."""
+    df = df[fields].astype(object)
+    return df.where(df.notna(), None).to_dict("records")
+
+
+def _list_param(name):
+    return [
+        value.strip()
+        for raw_value in request.args.getlist(name)
+        for value in raw_value.split(",")
+        if value.strip()
+    ]
+
+
+def _page_size():
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise _BadRequest("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise _BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def _offset(catalog_version):
+    """Returns where the page starts, from `cursor` or, for convenience, `page`."""
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            version, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            offset = int(offset)
+        except ValueError:
+            raise _BadRequest("Invalid cursor")
+        if offset < 0:
+            raise _BadRequest("Invalid cursor")
+        if version != catalog_version:
+            raise _BadRequest("The catalog changed since the cursor was issued")
+        return offset
+
+    try:
+        page = int(request.args.get("page", 1))
+    except ValueError:
+        raise _BadRequest("page must be an integer")
+    if page < 1:
+        raise _BadRequest("page must be greater than zero")
+    return (page - 1) * _page_size()
+
+
+def _encode_cursor(catalog_version, offset):
+    return base64.urlsafe_b64encode(f"{catalog_version}:{offset}".encode()).decode()
+
+
+def _etag(catalog_version):
+    query = "&".join(
+        f"{key}={value}" for key, value in sorted(request.args.items(multi=True))
+    )
+    return hashlib.sha256(f"{catalog_version}?{query}".encode("utf-8")).hexdigest()[:32]
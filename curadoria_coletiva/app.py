@@ -1,35 +1,87 @@
-import dash
-from dash import dcc, html, Input, Output
-import pandas as pd
-import yaml
+import json
+import os
+import sys
 
-from curadoria_coletiva.collect_materials import collect_materials
+import dash
+import flask
+from dash import dcc, html, Input, Output, State
+
+from curadoria_coletiva.api import register_api_routes
+from curadoria_coletiva.collection_registry import (
+    DEFAULT_COLLECTION,
+    CatalogTooLargeError,
+    Collection,
+    CollectionRegistry,
+    default_memory_budget_mb,
+    discover_collections,
+)
+from curadoria_coletiva.layout_cache import (
+    layout_file_path,
+    layout_version,
+    package_sources,
+    serve_layout_file,
+)
+from curadoria_coletiva.learning_paths import DIFFICULTY_LEVELS
+from curadoria_coletiva.material_filters import SORTABLE_FIELDS
+from curadoria_coletiva.memory_report import DEFAULT_MACHINE_MEMORY_MB
 
 materials_path = "curadoria_coletiva/materials"
-yaml_file_path = "curadoria_coletiva/all_materials.yml"
+catalog_output_dir = "curadoria_coletiva"
+collections_dir = "curadoria_coletiva/colecoes"
+layout_build_dir = "curadoria_coletiva/build"
+
+# Quantos resultados aparecem de cada vez; o botão "Mostrar mais" acrescenta outra
+# página. Assim o layout inicial e as respostas do callback não crescem com o catálogo.
+RESULTS_PAGE_SIZE = 20
+
+external_stylesheets = [
+    "https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css"
+]
+
+# "pandas" keeps the materials, their learning paths and similar materials in each
+# worker; "sqlite" keeps them only in the SQLite catalog, shared by all workers through
+# the OS page cache. Either way, each worker still keeps its own page layout.
+catalog_engine = os.environ.get("CATALOG_ENGINE", "pandas")
+
+# Memória que os catálogos carregados podem ocupar juntos, somando todos os workers do
+# gunicorn (WEB_CONCURRENCY). Os menos usados recentemente são descarregados quando ela
+# é ultrapassada; um catálogo que sozinho não cabe gera um aviso ("warn") ou não é
+# carregado ("refuse"), conforme MEMORY_BUDGET_ACTION. Por padrão, é a memória da
+# máquina (MACHINE_MEMORY_MB) menos o que cada worker usa sem catálogo nenhum
+# (WORKER_OVERHEAD_MB, medido pelo memory_report.py).
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+machine_memory_mb = int(os.environ.get("MACHINE_MEMORY_MB", DEFAULT_MACHINE_MEMORY_MB))
+collections_memory_budget_mb = int(
+    os.environ.get(
+        "COLLECTIONS_MEMORY_BUDGET_MB",
+        default_memory_budget_mb(machine_memory_mb, workers),
+    )
+)
+memory_budget_action = os.environ.get("MEMORY_BUDGET_ACTION", "warn")
 
-collect_materials(materials_path, yaml_file_path)
+registry = CollectionRegistry(
+    collections_memory_budget_mb * 1024 * 1024 // workers,
+    catalog_engine,
+    memory_budget_action,
+)
+# O app principal mantém o catálogo padrão (e o layout dele) o tempo todo, então ele
+# nunca é descarregado.
+registry.register(
+    Collection(DEFAULT_COLLECTION, materials_path, catalog_output_dir), pinned=True
+)
+for collection in discover_collections(collections_dir):
+    registry.register(collection)
 
 app = dash.Dash(
     __name__,
-    external_stylesheets=[
-        "https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css"
-    ],
+    external_stylesheets=external_stylesheets,
 )
 app.title = "Curadoria Coletiva"
 
 
-def _load_yaml_data(file_path):
-    with open(file_path, "r", encoding="utf-8") as file:
-        return yaml.safe_load(file)
-
-
-def _create_dataframe(data):
-    return pd.DataFrame(data)
-
-
-def _create_layout(df):
+def _create_layout(catalog):
     """Creates the layout for the Dash app."""
+    df = catalog.search()
     return html.Div(
         style={
             "font-family": "Arial, sans-serif",
@@ -73,22 +125,37 @@ def _create_layout(df):
                     "font-weight": "bold",
                 },
             ),
-            _create_filter_dropdowns(df),
+            _create_filter_dropdowns(catalog),
             html.Div(
                 id="results-section",
                 style={"margin-top": "30px"},
                 children=[
+                    # A primeira página dos resultados sem filtros já vem no layout,
+                    # assim a página não precisa esperar o callback para mostrá-la.
                     html.H2(
                         id="results-section-title",
-                        children="Resultados",
+                        children=f"Resultados ({len(df)})",
                         style={
                             "color": "#8B008B",
                             "margin-bottom": "20px",
                         },
                     ),
-                    html.Div(id="results"),
+                    html.Div(
+                        id="results",
+                        children=generate_result_layout(
+                            df.iloc[:RESULTS_PAGE_SIZE], catalog
+                        ),
+                    ),
+                    html.Button(
+                        "Mostrar mais",
+                        id="show-more-button",
+                        n_clicks=0,
+                        style=_show_more_button_style(len(df) > RESULTS_PAGE_SIZE),
+                    ),
+                    dcc.Store(id="results-limit", data=RESULTS_PAGE_SIZE),
                 ]
             ),
+            _create_learning_path_section(catalog.covered_subjects),
             _create_footer()
         ],
     )
@@ -148,7 +215,7 @@ def _create_search_box():
     )
 
 
-def _create_filter_dropdowns(df):
+def _create_filter_dropdowns(catalog):
     """Creates the dropdowns for subject, format, and sorting filters."""
     return html.Div(
         style={
@@ -167,7 +234,7 @@ def _create_filter_dropdowns(df):
                 id="subject-dropdown",
                 options=[
                     {"label": i, "value": i}
-                    for i in sorted(df["assuntos"].explode().unique().tolist())
+                    for i in catalog.distinct_values("assuntos")
                 ],
                 placeholder="Assunto",
                 style={"width": "100%"},
@@ -176,7 +243,7 @@ def _create_filter_dropdowns(df):
             dcc.Dropdown(
                 id="format-dropdown",
                 options=[
-                    {"label": i, "value": i} for i in sorted(df["formato"].unique())
+                    {"label": i, "value": i} for i in catalog.distinct_values("formato")
                 ],
                 placeholder="Formato",
                 style={"width": "100%"},
@@ -185,7 +252,7 @@ def _create_filter_dropdowns(df):
             dcc.Dropdown(
                 id="learning-style-dropdown",
                 options=[
-                    {"label": i, "value": i} for i in sorted(df["estilo_aprendizagem"].unique())
+                    {"label": i, "value": i} for i in catalog.distinct_values("estilo_aprendizagem")
                 ],
                 multi=True,
                 placeholder="Estilo de aprendizagem",
@@ -194,7 +261,7 @@ def _create_filter_dropdowns(df):
             dcc.Dropdown(
                 id="language-dropdown",
                 options=[
-                    {"label": i, "value": i} for i in sorted(df["idioma"].unique())
+                    {"label": i, "value": i} for i in catalog.distinct_values("idioma")
                 ],
                 multi=True,
                 placeholder="Idioma",
@@ -203,7 +270,7 @@ def _create_filter_dropdowns(df):
             dcc.Dropdown(
                 id="level-dropdown",
                 options=[
-                    {"label": i, "value": i} for i in sorted(df["nivel_dificuldade"].unique())
+                    {"label": i, "value": i} for i in catalog.distinct_values("nivel_dificuldade")
                 ],
                 multi=True,
                 placeholder="Dificuldade",
@@ -221,8 +288,7 @@ def _create_filter_dropdowns(df):
                 id="sort-dropdown",
                 options=[
                     {"label": col.replace("_", " ").capitalize(), "value": col}
-                    for col in df.columns
-                    if col not in ["file_path", "url"]
+                    for col in SORTABLE_FIELDS
                 ],
                 placeholder="Ordenar por",
                 style={"width": "100%"},
@@ -230,6 +296,111 @@ def _create_filter_dropdowns(df):
         ],
     )
 
+def _show_more_button_style(visible):
+    return {
+        "display": "block" if visible else "none",
+        "margin": "0 auto",
+        "color": "#6A1B9A",
+        "font-weight": "bold",
+        "background-color": "#F9F9F9",
+        "border": "2px solid #E1BEE7",
+        "border-radius": "10px",
+        "padding": "10px 20px",
+    }
+
+
+def _create_learning_path_section(covered_subjects):
+    """Creates the section to find a learning path to a subject."""
+    return html.Div(
+        id="learning-path-section",
+        style={"margin-top": "30px", "margin-bottom": "30px"},
+        children=[
+            html.H2(
+                "Trilhas de Aprendizado",
+                style={
+                    "color": "#8B008B",
+                    "margin-bottom": "20px",
+                },
+            ),
+            html.Div(
+                style={
+                    "display": "flex",
+                    "flex-wrap": "wrap",
+                    "gap": "10px",
+                    "margin-bottom": "20px",
+                    "border": "2px solid #E1BEE7",  # Cor da borda mais suave
+                    "border-radius": "10px",  # Borda arredondada
+                    "padding": "10px",  # Adiciona algum espaçamento interno
+                    "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)",  # Sombra suave para dar profundidade
+                    "background-color": "#F9F9F9",  # Cor de fundo clara
+                },
+                children=[
+                    dcc.Dropdown(
+                        id="path-subject-dropdown",
+                        options=[
+                            {"label": i, "value": i} for i in covered_subjects
+                        ],
+                        placeholder="Quero aprender",
+                        style={"width": "100%"},
+                    ),
+                    dcc.Dropdown(
+                        id="path-level-dropdown",
+                        options=[{"label": i, "value": i} for i in DIFFICULTY_LEVELS],
+                        value=DIFFICULTY_LEVELS[0],
+                        clearable=False,
+                        placeholder="Dificuldade máxima",
+                        style={"width": "100%"},
+                    ),
+                    dcc.Input(
+                        id="path-minutes-input",
+                        type="number",
+                        min=1,
+                        placeholder="Tempo disponível (minutos)",
+                        style={"width": "100%", "padding": "5px"},
+                    ),
+                ],
+            ),
+            html.Div(id="learning-path"),
+        ],
+    )
+
+
+def _generate_learning_path_layout(path):
+    if path is None:
+        return html.P(
+            "Nenhuma trilha encontrada para esse assunto, dificuldade e tempo disponível."
+        )
+
+    children = [
+        html.P(f"Tempo total: {path['minutos']} minutos"),
+        html.Ol(
+            [
+                html.Li(
+                    [
+                        html.A(
+                            material["titulo"],
+                            href=material["url"],
+                            target="_blank",
+                            style={"color": "#3949AB", "text-decoration": "underline"},
+                        ),
+                        f" ({material['nivel_dificuldade']}, "
+                        f"{material['minutos_necessarios']} minutos)",
+                    ]
+                )
+                for material in path["materiais"]
+            ]
+        ),
+    ]
+    if path["conhecimentos_previos"]:
+        children.append(
+            html.P(
+                "Conhecimentos prévios esperados: "
+                + ", ".join(path["conhecimentos_previos"])
+            )
+        )
+    return children
+
+
 def _create_footer():
     return html.Footer(
         style={
@@ -330,12 +501,12 @@ def _create_footer():
 
 
 
-def generate_result_layout(filtered_df):
+def generate_result_layout(filtered_df, catalog):
     result_layout = []
     for _, row in filtered_df.iterrows():
         result_layout.append(
             html.Div(
-                _generate_result_for_row(row),
+                _generate_result_for_row(row, catalog),
                 style={
                     "border": "2px solid #E1BEE7",  # Cor da borda
                     "border-radius": "10px",  # Borda arredondada
@@ -350,7 +521,7 @@ def generate_result_layout(filtered_df):
     return result_layout
 
 
-def _generate_result_for_row(row):
+def _generate_result_for_row(row, catalog):
     result_row = []
 
     result_row.append(
@@ -364,9 +535,9 @@ def _generate_result_for_row(row):
         )
     )
 
-    for col in df.columns:
+    for col in catalog.fields:
         if col != "comentarios" and col != "file_path":
-            result_row.extend(_generate_field_content(row, col))
+            result_row.extend(_generate_field_content(row, col, catalog))
 
     github_edit_link = f"https://github.com/cumbucadev/curadoria-coletiva/edit/main/curadoria-coletiva/{row['file_path']}"
     result_row.append(
@@ -394,11 +565,12 @@ def _generate_result_for_row(row):
     )
 
     result_row.append(_generate_collapsible_comments(row))
+    result_row.extend(_generate_similar_materials(row, catalog))
 
     return result_row
 
 
-def _generate_field_content(row, col):
+def _generate_field_content(row, col, catalog):
     field_content = []
     if col == "url":
         field_content.append(
@@ -411,6 +583,7 @@ def _generate_field_content(row, col):
                         target="_blank",
                         style={"color": "#3949AB", "text-decoration": "underline"},
                     ),
+                    *_generate_link_status(row[col], catalog.link_status),
                 ]
             )
         )
@@ -444,6 +617,19 @@ def _generate_field_content(row, col):
     return field_content
 
 
+def _generate_link_status(url, link_status):
+    status = link_status.get(url)
+    if status is None or status["ok"]:
+        return []
+    return [
+        html.Span(
+            " ⚠️ Link indisponível",
+            title=f"Status: {status['status'] or status['error']}",
+            style={"color": "#C62828", "font-weight": "bold"},
+        )
+    ]
+
+
 def _generate_collapsible_comments(row):
     comments_text = "".join(
         [
@@ -472,9 +658,41 @@ def _generate_collapsible_comments(row):
     )
 
 
-def _register_callbacks(app, df):
+def _generate_similar_materials(row, catalog):
+    similar_materials = catalog.similar(row["titulo"])
+    if not similar_materials:
+        return []
+    return [
+        html.Div(
+            [
+                html.Span("Materiais semelhantes: ", style={"font-weight": "bold"}),
+                html.Ul(
+                    [
+                        html.Li(
+                            html.A(
+                                material["titulo"],
+                                href=material["url"],
+                                target="_blank",
+                                style={"color": "#3949AB"},
+                            )
+                        )
+                        for material in similar_materials
+                    ]
+                ),
+            ],
+            style={"margin-bottom": "10px"},
+        )
+    ]
+
+
+def _register_callbacks(app, get_catalog):
     @app.callback(
-        [Output("results", "children"), Output("results-section-title", "children")],
+        [
+            Output("results", "children"),
+            Output("results-section-title", "children"),
+            Output("show-more-button", "style"),
+            Output("results-limit", "data"),
+        ],
         Input("search-box", "value"),
         Input("subject-dropdown", "value"),
         Input("format-dropdown", "value"),
@@ -483,6 +701,9 @@ def _register_callbacks(app, df):
         Input("level-dropdown", "value"),
         Input("free-filter", "value"),
         Input("sort-dropdown", "value"),
+        Input("show-more-button", "n_clicks"),
+        State("results-limit", "data"),
+        prevent_initial_call=True,
     )
     def update_table(
         search_term,
@@ -493,63 +714,119 @@ def _register_callbacks(app, df):
         selected_level,
         free_filter,
         sort_column,
+        show_more_clicks,
+        results_limit,
     ):
-        """Atualiza a tabela e o título com a contagem de resultados com base nos filtros."""
-        filtered_df = df
-
-        # Aplicar os filtros
-        if search_term:
-            filtered_df = filtered_df[
-                filtered_df.apply(
-                    lambda row: row.astype(str)
-                    .str.contains(search_term, case=False)
-                    .any(),
-                    axis=1,
-                )
-            ]
-
-        if selected_subject:
-            filtered_df = filtered_df[
-                filtered_df["assuntos"].apply(
-                    lambda x: all(cat in x for cat in selected_subject)
-                )
-            ]
-
-        if selected_format:
-            filtered_df = filtered_df[filtered_df["formato"].isin(selected_format)]
-
-        if selected_learning_style:
-            filtered_df = filtered_df[filtered_df["estilo_aprendizagem"].isin(selected_learning_style)]
-
-        if selected_language:
-            filtered_df = filtered_df[filtered_df["idioma"].isin(selected_language)]
-
-        if selected_level:
-            filtered_df = filtered_df[filtered_df["nivel_dificuldade"].isin(selected_level)]
-
-        if free_filter:
-            filtered_df = filtered_df[filtered_df["eh_gratuito"] == True]
-
-        # Aplicar ordenação se selecionada
-        if sort_column:
-            filtered_df = filtered_df.sort_values(by=sort_column)
+        """Atualiza a tabela e o título com a contagem de resultados com base nos filtros.
+
+        Mostra uma página de resultados a mais a cada clique em "Mostrar mais" e volta
+        para a primeira página quando os filtros mudam."""
+        if dash.ctx.triggered_id == "show-more-button":
+            results_limit = (results_limit or RESULTS_PAGE_SIZE) + RESULTS_PAGE_SIZE
+        else:
+            results_limit = RESULTS_PAGE_SIZE
+
+        catalog = get_catalog()
+        filtered_df = catalog.search(
+            search_term,
+            selected_subject,
+            selected_format,
+            selected_learning_style,
+            selected_language,
+            selected_level,
+            free_filter,
+            sort_column,
+        )
 
         # Contagem de resultados
         result_count = len(filtered_df)
         result_title = f"Resultados ({result_count})"
 
         # Layout dos resultados
-        result_layout = generate_result_layout(filtered_df)
+        result_layout = generate_result_layout(filtered_df.iloc[:results_limit], catalog)
+        show_more_style = _show_more_button_style(result_count > results_limit)
+
+        return result_layout, result_title, show_more_style, results_limit
+
+    @app.callback(
+        Output("learning-path", "children"),
+        Input("path-subject-dropdown", "value"),
+        Input("path-level-dropdown", "value"),
+        Input("path-minutes-input", "value"),
+        prevent_initial_call=True,
+    )
+    def update_learning_path(subject, level, max_minutes):
+        """Mostra a trilha pré-calculada para o assunto escolhido."""
+        if not subject:
+            return []
 
-        return result_layout, result_title
+        return _generate_learning_path_layout(
+            get_catalog().learning_path(subject, level, max_minutes)
+        )
 
 
-data = _load_yaml_data(yaml_file_path)
-df = _create_dataframe(data)
+def _create_collection_app(name):
+    """Creates the Dash app of a collection, served under /colecoes/<name>/.
 
-app.layout = _create_layout(df)
+    The catalog is only loaded on the first visit, and the layout is built once per
+    loaded catalog, so collections nobody visits cost no memory."""
+    collection_app = dash.Dash(
+        __name__,
+        server=server,
+        url_base_pathname=f"/colecoes/{name}/",
+        external_stylesheets=external_stylesheets,
+        suppress_callback_exceptions=True,
+    )
+    collection_app.title = f"Curadoria Coletiva - {name}"
+
+    def serve_layout():
+        # Dash builds the layout of every app on the first request to the server, to
+        # validate it: only load the catalog for requests to this collection.
+        if not flask.request.path.startswith(f"/colecoes/{name}/"):
+            return html.Div()
+
+        return registry.cached(name, "layout", _create_layout)
+
+    collection_app.layout = serve_layout
+    _register_callbacks(collection_app, lambda: registry.get(name))
+    return collection_app
+
+
+try:
+    default_catalog = registry.get(DEFAULT_COLLECTION)
+except CatalogTooLargeError as e:
+    # Sem o catálogo padrão o app não tem o que servir: encerra o worker explicando
+    # como ajustar o orçamento, em vez de deixar só o traceback no log.
+    sys.exit(
+        f"{e}. Increase COLLECTIONS_MEMORY_BUDGET_MB (currently "
+        f"{collections_memory_budget_mb} MB shared by {workers} worker(s)), lower "
+        f"WEB_CONCURRENCY or set MEMORY_BUDGET_ACTION=warn to start anyway."
+    )
+
+current_layout_version = layout_version(
+    default_catalog.version,
+    json.dumps(default_catalog.link_status, sort_keys=True),
+    *package_sources(os.path.dirname(os.path.abspath(__file__))),
+)
+layout_file = layout_file_path(layout_build_dir, current_layout_version)
+
+if os.path.exists(layout_file):
+    # O layout pré-construído por `build_layout.py` é servido direto do arquivo,
+    # sem executar o código que monta os componentes.
+    app.config.suppress_callback_exceptions = True
+    app.layout = html.Div()
+    serve_layout_file(app, layout_file, current_layout_version)
+else:
+    app.layout = registry.cached(DEFAULT_COLLECTION, "layout", _create_layout)
 server = app.server
-_register_callbacks(app, df)
+_register_callbacks(app, lambda: registry.get(DEFAULT_COLLECTION))
+register_api_routes(server, registry, DEFAULT_COLLECTION)
+
+collection_apps = {
+    name: _create_collection_app(name)
+    for name in registry.names()
+    if name != DEFAULT_COLLECTION
+}
 
 if __name__ == "__main__":
     app.run_server(debug=True)
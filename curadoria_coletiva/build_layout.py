@@ -0,0 +1,24 @@
+import glob
+import importlib
+import os
+
+from curadoria_coletiva.layout_cache import build_layout_file
+
+BUILD_DIR = "curadoria_coletiva/build"
+
+
+def build_layout() -> None:
+    """Builds the initial page layout, including the unfiltered results, and saves it
+    so the app can serve it without running the layout code on each process start."""
+
+    # Remove previous layouts first: they are stale, and if one had the current version
+    # the app would serve it instead of building the layout to be saved.
+    for old_file in glob.glob(os.path.join(BUILD_DIR, "layout-*.json")):
+        os.remove(old_file)
+
+    app_module = importlib.import_module("curadoria_coletiva.app")
+    build_layout_file(app_module.app.layout, app_module.layout_file)
+
+
+if __name__ == "__main__":
+    build_layout()
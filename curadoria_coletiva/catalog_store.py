@@ -0,0 +1,471 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from curadoria_coletiva.collect_materials import create_temp_file
+from curadoria_coletiva.material_filters import matches_search_term, search_text
+
+SCALAR_FIELDS = [
+    "titulo",
+    "autoria",
+    "url",
+    "formato",
+    "minutos_necessarios",
+    "ritmo",
+    "estilo_aprendizagem",
+    "idioma",
+    "nivel_dificuldade",
+    "eh_gratuito",
+    "file_path",
+]
+LIST_FIELDS = ["assuntos", "prerequisitos", "recomendado_por", "comentarios"]
+
+# Same field order as the materials in all_materials.yml.
+FIELDS = [
+    "titulo",
+    "autoria",
+    "url",
+    "assuntos",
+    "formato",
+    "minutos_necessarios",
+    "prerequisitos",
+    "ritmo",
+    "estilo_aprendizagem",
+    "idioma",
+    "nivel_dificuldade",
+    "eh_gratuito",
+    "recomendado_por",
+    "comentarios",
+    "file_path",
+]
+
+_ENUM_FILTERS = {
+    "selected_format": "formato",
+    "selected_learning_style": "estilo_aprendizagem",
+    "selected_language": "idioma",
+    "selected_level": "nivel_dificuldade",
+}
+
+_MMAP_SIZE = 256 * 1024 * 1024
+
+# Bumped whenever the tables change, so databases written by older code are rewritten
+# even if the materials did not change.
+_SCHEMA_VERSION = 2
+
+# FTS5 trigram queries need at least three characters.
+_MIN_TRIGRAM_LENGTH = 3
+
+_SCHEMA = """
+CREATE TABLE catalog_info (
+    version TEXT,
+    schema_version INTEGER NOT NULL
+);
+CREATE TABLE materials (
+    id INTEGER PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    autoria TEXT,
+    url TEXT,
+    formato TEXT,
+    minutos_necessarios INTEGER,
+    ritmo TEXT,
+    estilo_aprendizagem TEXT,
+    idioma TEXT,
+    nivel_dificuldade TEXT,
+    eh_gratuito INTEGER,
+    file_path TEXT
+);
+CREATE TABLE subjects (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+CREATE TABLE material_subjects (
+    material_id INTEGER NOT NULL REFERENCES materials(id),
+    subject_id INTEGER NOT NULL REFERENCES subjects(id),
+    position INTEGER NOT NULL
+);
+CREATE TABLE material_prerequisites (
+    material_id INTEGER NOT NULL REFERENCES materials(id),
+    subject_id INTEGER NOT NULL REFERENCES subjects(id),
+    position INTEGER NOT NULL
+);
+CREATE TABLE material_recommenders (
+    material_id INTEGER NOT NULL REFERENCES materials(id),
+    usuario TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE comments (
+    material_id INTEGER NOT NULL REFERENCES materials(id),
+    usuario TEXT NOT NULL,
+    texto TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE similar_materials (
+    material_id INTEGER NOT NULL REFERENCES materials(id),
+    similar_id INTEGER NOT NULL REFERENCES materials(id),
+    position INTEGER NOT NULL
+);
+CREATE TABLE learning_paths (
+    assunto TEXT NOT NULL,
+    nivel_dificuldade TEXT NOT NULL,
+    minutos INTEGER,
+    trilha TEXT,
+    PRIMARY KEY (assunto, nivel_dificuldade)
+);
+CREATE VIRTUAL TABLE materials_fts USING fts5(texto, tokenize = 'trigram');
+CREATE INDEX materials_titulo ON materials(titulo);
+CREATE INDEX materials_formato ON materials(formato);
+CREATE INDEX materials_estilo_aprendizagem ON materials(estilo_aprendizagem);
+CREATE INDEX materials_idioma ON materials(idioma);
+CREATE INDEX materials_nivel_dificuldade ON materials(nivel_dificuldade);
+CREATE INDEX materials_eh_gratuito ON materials(eh_gratuito);
+CREATE INDEX material_subjects_subject ON material_subjects(subject_id, material_id);
+CREATE INDEX material_subjects_material ON material_subjects(material_id);
+CREATE INDEX material_prerequisites_material ON material_prerequisites(material_id);
+CREATE INDEX material_recommenders_material ON material_recommenders(material_id);
+CREATE INDEX comments_material ON comments(material_id);
+CREATE INDEX similar_materials_material ON similar_materials(material_id, position);
+"""
+
+_SELECT_MATERIALS = """
+SELECT
+    m.*,
+    (SELECT json_group_array(nome) FROM (
+        SELECT s.nome FROM material_subjects ms JOIN subjects s ON s.id = ms.subject_id
+        WHERE ms.material_id = m.id ORDER BY ms.position
+    )) AS assuntos,
+    (SELECT json_group_array(nome) FROM (
+        SELECT s.nome FROM material_prerequisites mp JOIN subjects s ON s.id = mp.subject_id
+        WHERE mp.material_id = m.id ORDER BY mp.position
+    )) AS prerequisitos,
+    (SELECT json_group_array(usuario) FROM (
+        SELECT usuario FROM material_recommenders
+        WHERE material_id = m.id ORDER BY position
+    )) AS recomendado_por,
+    (SELECT json_group_array(json_object('usuario', usuario, 'texto', texto)) FROM (
+        SELECT usuario, texto FROM comments WHERE material_id = m.id ORDER BY position
+    )) AS comentarios
+FROM materials m
+"""
+
+
+def write_catalog_db(
+    materials: List[Dict[str, Any]],
+    db_file: str,
+    version: Optional[str] = None,
+    similar_materials_file: Optional[str] = None,
+) -> None:
+    """Writes the materials to a SQLite database, replacing any previous one.
+
+    Besides the materials, the database keeps their learning paths and similar
+    materials, computed here, so the app keeps nothing per material in memory. The
+    similar materials saved in `similar_materials_file`, if given, are reused as
+    `build_similar_materials` does.
+
+    The database is built in a temporary file and then renamed, so readers never
+    see a half-written catalog. If `version` is given, it is saved in the database
+    and a database already at that version is not rewritten."""
+    from curadoria_coletiva.learning_paths import LearningPathGraph
+    from curadoria_coletiva.recommendations import build_similar_materials
+
+    if version is not None and read_catalog_db_version(db_file) == version:
+        print(f"All materials in {db_file} are up to date")
+        return
+
+    file_descriptor, temp_file = create_temp_file(db_file)
+    os.close(file_descriptor)
+
+    connection = sqlite3.connect(temp_file)
+    try:
+        connection.executescript(_SCHEMA)
+        connection.execute(
+            "INSERT INTO catalog_info (version, schema_version) VALUES (?, ?)",
+            (version, _SCHEMA_VERSION),
+        )
+        subject_ids: Dict[str, int] = {}
+
+        def subject_id(name: str) -> int:
+            if name not in subject_ids:
+                cursor = connection.execute("INSERT INTO subjects (nome) VALUES (?)", (name,))
+                subject_ids[name] = cursor.lastrowid
+            return subject_ids[name]
+
+        for material_id, material in enumerate(materials, start=1):
+            connection.execute(
+                f"INSERT INTO materials (id, {', '.join(SCALAR_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' for _ in SCALAR_FIELDS)})",
+                [material_id] + [material.get(field) for field in SCALAR_FIELDS],
+            )
+            connection.executemany(
+                "INSERT INTO material_subjects VALUES (?, ?, ?)",
+                [
+                    (material_id, subject_id(name), position)
+                    for position, name in enumerate(material.get("assuntos") or [])
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO material_prerequisites VALUES (?, ?, ?)",
+                [
+                    (material_id, subject_id(name), position)
+                    for position, name in enumerate(material.get("prerequisitos") or [])
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO material_recommenders VALUES (?, ?, ?)",
+                [
+                    (material_id, usuario, position)
+                    for position, usuario in enumerate(material.get("recomendado_por") or [])
+                ],
+            )
+            comments = material.get("comentarios") or []
+            connection.executemany(
+                "INSERT INTO comments VALUES (?, ?, ?, ?)",
+                [
+                    (material_id, comment["usuario"], comment["texto"], position)
+                    for position, comment in enumerate(comments)
+                ],
+            )
+            connection.execute(
+                "INSERT INTO materials_fts (rowid, texto) VALUES (?, ?)",
+                (material_id, search_text(material)),
+            )
+
+        # A reused matrix keeps the materials in the order they were added to it.
+        similar_materials = build_similar_materials(materials, similar_materials_file)
+        material_ids = {
+            material["titulo"]: material_id
+            for material_id, material in enumerate(materials, start=1)
+        }
+        connection.executemany(
+            "INSERT INTO similar_materials VALUES (?, ?, ?)",
+            [
+                (
+                    material_ids[title],
+                    material_ids[similar_materials.titles[similar_index]],
+                    position,
+                )
+                for title, neighbors in zip(
+                    similar_materials.titles, similar_materials.neighbors
+                )
+                for position, similar_index in enumerate(neighbors)
+                if similar_index >= 0
+            ],
+        )
+
+        learning_paths = LearningPathGraph(materials)
+        connection.executemany(
+            "INSERT INTO learning_paths VALUES (?, ?, ?, ?)",
+            [
+                (
+                    subject,
+                    level,
+                    path and path["minutos"],
+                    path and json.dumps(path, ensure_ascii=False),
+                )
+                for (subject, level), path in learning_paths.paths.items()
+            ],
+        )
+
+        connection.commit()
+        connection.execute("VACUUM")
+    except Exception:
+        connection.close()
+        os.remove(temp_file)
+        raise
+    connection.close()
+
+    os.replace(temp_file, db_file)
+    print(f"All materials saved to {db_file}")
+
+
+def read_catalog_db_version(db_file: str) -> Optional[str]:
+    """Returns the catalog version saved in a database written by `write_catalog_db`,
+    or None if there is no such database or it has no version."""
+    if not os.path.exists(db_file):
+        return None
+    connection = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        row = connection.execute(
+            "SELECT version, schema_version FROM catalog_info"
+        ).fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        connection.close()
+    if row is None or row[1] != _SCHEMA_VERSION:
+        return None
+    return row[0]
+
+
+class CatalogStore:
+    """
+    Read-only access to a catalog database written by `write_catalog_db`.
+
+    Each thread gets its own connection, opened once and reused for every query.
+    Connections are read-only and memory-map the database file, so processes reading
+    the same catalog share its pages through the OS page cache.
+
+    Attributes:
+        db_file (str): Path of the catalog database.
+    """
+
+    def __init__(self, db_file: str) -> None:
+        self.db_file = db_file
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.db_file}?mode=ro", uri=True, check_same_thread=False
+            )
+            connection.row_factory = sqlite3.Row
+            connection.create_function(
+                "matches_search_term", 2, matches_search_term, deterministic=True
+            )
+            connection.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+            connection.execute("PRAGMA query_only = 1")
+            self._local.connection = connection
+        return connection
+
+    def distinct_values(self, field: str) -> List[str]:
+        """Returns the sorted distinct values of an enum field or of `assuntos`,
+        leaving out missing values."""
+        if field == "assuntos":
+            query = (
+                "SELECT DISTINCT s.nome FROM subjects s "
+                "JOIN material_subjects ms ON ms.subject_id = s.id ORDER BY s.nome"
+            )
+        elif field in _ENUM_FILTERS.values():
+            query = (
+                f"SELECT DISTINCT {field} FROM materials "
+                f"WHERE {field} IS NOT NULL ORDER BY {field}"
+            )
+        else:
+            raise ValueError(f"Unknown field: {field}")
+        return [row[0] for row in self._connection().execute(query)]
+
+    def search(
+        self,
+        search_term: Optional[str] = None,
+        selected_subject: Optional[List[str]] = None,
+        selected_format: Optional[List[str]] = None,
+        selected_learning_style: Optional[List[str]] = None,
+        selected_language: Optional[List[str]] = None,
+        selected_level: Optional[List[str]] = None,
+        free_filter: Optional[List[str]] = None,
+        sort_column: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Filters and sorts the materials like `filter_materials`, with the same
+        results.
+
+        The search term is matched as `filter_materials` does, against the same
+        `search_text`. Terms long enough for the trigram index are looked up in it
+        first, so only the materials it finds are checked.
+        """
+        conditions = []
+        parameters: List[Any] = []
+
+        if search_term:
+            if len(search_term) >= _MIN_TRIGRAM_LENGTH:
+                conditions.append(
+                    "m.id IN (SELECT rowid FROM materials_fts WHERE materials_fts MATCH ? "
+                    "AND matches_search_term(texto, ?))"
+                )
+                parameters.extend([_fts_phrase(search_term), search_term])
+            else:
+                conditions.append(
+                    "m.id IN (SELECT rowid FROM materials_fts "
+                    "WHERE matches_search_term(texto, ?))"
+                )
+                parameters.append(search_term)
+
+        for subject in selected_subject or []:
+            conditions.append(
+                "m.id IN (SELECT ms.material_id FROM material_subjects ms "
+                "JOIN subjects s ON s.id = ms.subject_id WHERE s.nome = ?)"
+            )
+            parameters.append(subject)
+
+        filters = {
+            "selected_format": selected_format,
+            "selected_learning_style": selected_learning_style,
+            "selected_language": selected_language,
+            "selected_level": selected_level,
+        }
+        for argument, values in filters.items():
+            if values:
+                conditions.append(
+                    f"m.{_ENUM_FILTERS[argument]} IN ({', '.join('?' for _ in values)})"
+                )
+                parameters.extend(values)
+
+        if free_filter:
+            conditions.append("m.eh_gratuito = 1")
+
+        query = _SELECT_MATERIALS
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if sort_column in SCALAR_FIELDS:
+            query += f" ORDER BY m.{sort_column}, m.id"
+        else:
+            query += " ORDER BY m.id"
+
+        materials = [
+            _row_to_material(row) for row in self._connection().execute(query, parameters)
+        ]
+        if sort_column in LIST_FIELDS:
+            materials.sort(key=lambda material: material[sort_column])
+        return materials
+
+
+    def similar(self, title: str) -> List[Dict[str, str]]:
+        """Returns the title and URL of the materials most similar to the given one,
+        most similar first."""
+        query = (
+            "SELECT s.titulo, s.url FROM materials m "
+            "JOIN similar_materials sm ON sm.material_id = m.id "
+            "JOIN materials s ON s.id = sm.similar_id "
+            "WHERE m.titulo = ? ORDER BY sm.position"
+        )
+        return [
+            {"titulo": row["titulo"], "url": row["url"]}
+            for row in self._connection().execute(query, (title,))
+        ]
+
+    def covered_subjects(self) -> List[str]:
+        """Returns the subjects covered by at least one material, sorted."""
+        query = "SELECT DISTINCT assunto FROM learning_paths ORDER BY assunto"
+        return [row[0] for row in self._connection().execute(query)]
+
+    def learning_path(
+        self, subject: str, level: str, max_minutes: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the learning path saved for a subject and level, like
+        `LearningPathGraph.learning_path`."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT trilha FROM learning_paths "
+                "WHERE assunto = ? AND nivel_dificuldade = ? AND trilha IS NOT NULL "
+                "AND (? IS NULL OR minutos <= ?)",
+                (subject, level, max_minutes, max_minutes),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+
+def _row_to_material(row: sqlite3.Row) -> Dict[str, Any]:
+    material = {field: row[field] for field in FIELDS}
+    for field in LIST_FIELDS:
+        material[field] = json.loads(material[field])
+    material["eh_gratuito"] = bool(material["eh_gratuito"])
+    return material
+
+
+def _fts_phrase(search_term: str) -> str:
+    """Quotes a search term as an FTS5 phrase, which the trigram index matches as a
+    substring."""
+    return '"' + search_term.replace('"', '""') + '"'
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import yaml
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_CONCURRENCY = 100
+DEFAULT_PER_HOST_CONCURRENCY = 4
+DEFAULT_RETRIES = 2
+DEFAULT_TIMEOUT_SECONDS = 15
+
+# Statuses worth retrying: the server may answer differently a moment later.
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def check_links(
+    yaml_file: str,
+    cache_file: str,
+    ttl_seconds: int = DEFAULT_TTL_SECONDS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_host_concurrency: int = DEFAULT_PER_HOST_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+    timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+) -> Dict[str, Dict[str, Any]]:
+    """Checks whether the URL of each material still works and saves the results.
+
+    Results are cached in `cache_file` by URL. Only URLs that are not cached or whose
+    result is older than `ttl_seconds` are checked again, using the cached ETag and
+    Last-Modified headers so unchanged pages can answer with a cheap 304. URLs no
+    longer in the catalog are dropped from the cache.
+
+    Args:
+        yaml_file (str): The collected materials file.
+        cache_file (str): The JSON file where link statuses are cached.
+        ttl_seconds (int): How long a cached result is considered fresh.
+        concurrency (int): Maximum number of simultaneous requests.
+        per_host_concurrency (int): Maximum number of simultaneous requests per host.
+        retries (int): How many times a failed request is retried.
+        timeout_seconds (int): Timeout of each request, counted from when it gets
+            its concurrency slots, so requests queued behind others of the same host
+            do not time out while waiting.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The status of each URL in the catalog.
+    """
+    urls = _load_material_urls(yaml_file)
+    cache = _load_cache(cache_file)
+    now = time.time()
+
+    link_status = {url: cache[url] for url in urls if url in cache}
+    stale_urls = [
+        url
+        for url in urls
+        if url not in link_status
+        or now - link_status[url].get("checked_at", 0) > ttl_seconds
+    ]
+
+    if stale_urls:
+        results = asyncio.run(
+            _check_urls(
+                stale_urls,
+                link_status,
+                concurrency,
+                per_host_concurrency,
+                retries,
+                timeout_seconds,
+            )
+        )
+        link_status.update(results)
+
+    _save_cache(link_status, cache_file)
+
+    broken = sum(1 for status in link_status.values() if not status["ok"])
+    print(
+        f"Checked {len(stale_urls)} of {len(urls)} links, {broken} broken. "
+        f"Results saved to {cache_file}"
+    )
+
+    return link_status
+
+
+def _load_material_urls(yaml_file: str) -> List[str]:
+    """Returns the unique material URLs of the collected materials file, in order."""
+    with open(yaml_file, "r", encoding="utf-8") as file:
+        materials = yaml.safe_load(file) or []
+
+    return list(
+        dict.fromkeys(material["url"] for material in materials if material.get("url"))
+    )
+
+
+def _load_cache(cache_file: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(cache_file):
+        return {}
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except json.JSONDecodeError as e:
+        print(f"Error reading link status cache {cache_file}: {e}")
+        return {}
+
+
+def _save_cache(link_status: Dict[str, Dict[str, Any]], cache_file: str) -> None:
+    with open(cache_file, "w", encoding="utf-8") as file:
+        json.dump(link_status, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+async def _check_urls(
+    urls: List[str],
+    cached_status: Dict[str, Dict[str, Any]],
+    concurrency: int,
+    per_host_concurrency: int,
+    retries: int,
+    timeout_seconds: int,
+) -> Dict[str, Dict[str, Any]]:
+    """Checks all URLs concurrently over a shared connection pool.
+
+    Concurrency is bounded with semaphores rather than by the limits of the pool: a
+    request only starts, and its timeout only starts counting, once it holds a slot,
+    so it never waits for a connection of the pool."""
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+    slots = asyncio.Semaphore(concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(per_host_concurrency)
+    )
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(
+            *(
+                _check_url(
+                    session,
+                    url,
+                    cached_status.get(url),
+                    retries,
+                    slots,
+                    host_slots[urlsplit(url).hostname or ""],
+                )
+                for url in urls
+            )
+        )
+
+    return dict(zip(urls, results))
+
+
+async def _check_url(
+    session: aiohttp.ClientSession,
+    url: str,
+    cached: Optional[Dict[str, Any]],
+    retries: int,
+    slots: asyncio.Semaphore,
+    host_slots: asyncio.Semaphore,
+) -> Dict[str, Any]:
+    """Requests a URL, retrying transient failures with exponential backoff. The
+    concurrency slots are held during each attempt, but not during the backoff."""
+    headers = {}
+    if cached and cached.get("ok"):
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    error = None
+    status = None
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+        try:
+            async with host_slots, slots, session.get(
+                url, headers=headers, allow_redirects=True
+            ) as response:
+                status = response.status
+                error = None
+                if status == 304 and cached:
+                    return {**cached, "checked_at": time.time()}
+                if status in _RETRY_STATUSES:
+                    continue
+
+                return {
+                    "ok": status < 400,
+                    "status": status,
+                    "error": None,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "checked_at": time.time(),
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = None
+            error = str(e) or type(e).__name__
+
+    return {
+        "ok": False,
+        "status": status,
+        "error": error,
+        "etag": None,
+        "last_modified": None,
+        "checked_at": time.time(),
+    }
+
+
+if __name__ == "__main__":
+    check_links(
+        "curadoria_coletiva/all_materials.yml", "curadoria_coletiva/link_status.json"
+    )
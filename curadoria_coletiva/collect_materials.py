@@ -1,16 +1,37 @@
+import hashlib
+import json
 import os
+import secrets
 import yaml
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
+_HEADER = "# auto-generated file, please don't change it\n"
+_VERSION_PREFIX = "# catalog version: "
 
-def collect_materials(directory_path: str, output_file: str) -> None:
+
+def collect_materials(
+    directory_path: str,
+    output_file: str,
+    db_file: Optional[str] = None,
+    similar_materials_file: Optional[str] = None,
+) -> str:
     """Reads all YAML files in a directory, validates each material,
     and collects them into a list, ensuring there are no duplicate titles.
-    Adds 'directory/filename' to each material for reference."""
+    Adds 'directory/filename' to each material for reference.
+    If `db_file` is given, also writes the materials to a SQLite catalog, reusing the
+    similar materials saved in `similar_materials_file`, if given.
+
+    Files are read in name order, so the output only changes when the materials do.
+    The output embeds the catalog version and is not rewritten if that version is
+    already the one saved.
+
+    Returns:
+        str: The catalog version, a hash that changes whenever any material changes.
+    """
 
     all_materials: List[Dict[str, Any]] = []
 
-    for filename in os.listdir(directory_path):
+    for filename in sorted(os.listdir(directory_path)):
         if filename.lower().endswith((".yml", ".yaml")):
             file_path = os.path.join(directory_path, filename)
             materials_data = _load_yaml_file(file_path)
@@ -22,7 +43,53 @@ def collect_materials(directory_path: str, output_file: str) -> None:
 
                 all_materials.append(material_data)
 
-    _save_all_materials_to_yaml(all_materials, output_file)
+    version = catalog_version(all_materials)
+    if read_catalog_version(output_file) == version:
+        print(f"All materials in {output_file} are up to date")
+    else:
+        _save_all_materials_to_yaml(all_materials, output_file, version)
+
+    if db_file:
+        from curadoria_coletiva.catalog_store import write_catalog_db
+
+        write_catalog_db(all_materials, db_file, version, similar_materials_file)
+
+    return version
+
+
+def catalog_version(materials: List[Dict[str, Any]]) -> str:
+    """Returns a hash that changes whenever any material changes."""
+    content = json.dumps(materials, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def read_catalog_version(output_file: str) -> Optional[str]:
+    """Returns the catalog version saved in a file written by `collect_materials`,
+    or None if there is no such file or it has no version."""
+    if not os.path.exists(output_file):
+        return None
+    with open(output_file, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith(_VERSION_PREFIX):
+                return line[len(_VERSION_PREFIX) :].strip()
+            if not line.startswith("#"):
+                return None
+    return None
+
+
+def create_temp_file(output_file: str) -> Tuple[int, str]:
+    """Creates a new temporary file next to `output_file`, to be renamed over it once
+    written, and returns its file descriptor and path.
+
+    Unlike `tempfile.mkstemp`, which creates files readable only by their owner, the
+    file gets the mode `open` would give it, so other users (e.g. the web server) can
+    read the catalog files."""
+    temp_file = os.path.join(
+        os.path.dirname(output_file) or ".",
+        f".{os.path.basename(output_file)}.{secrets.token_hex(8)}.tmp",
+    )
+    file_descriptor = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    return file_descriptor, temp_file
 
 
 def _load_yaml_file(file_path: str) -> List[Dict[str, Any]]:
@@ -36,18 +103,28 @@ def _load_yaml_file(file_path: str) -> List[Dict[str, Any]]:
 
 
 def _save_all_materials_to_yaml(
-    materials: List[Dict[str, Any]], output_file: str
+    materials: List[Dict[str, Any]], output_file: str, version: str
 ) -> None:
-    """Saves the collected materials to a YAML file with UTF-8 encoding."""
-    with open(output_file, "w", encoding="utf-8") as file:
-        file.write("# auto-generated file, please don't change it\n\n")
-
-        yaml.dump(
-            materials,
-            file,
-            default_flow_style=False,
-            allow_unicode=True,
-            sort_keys=False,
-        )
+    """Saves the collected materials to a YAML file with UTF-8 encoding.
+
+    The file is written to a temporary file and then renamed, so concurrent readers
+    and writers never see a half-written catalog."""
+    file_descriptor, temp_file = create_temp_file(output_file)
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            file.write(_HEADER)
+            file.write(f"{_VERSION_PREFIX}{version}\n\n")
+
+            yaml.dump(
+                materials,
+                file,
+                default_flow_style=False,
+                allow_unicode=True,
+                sort_keys=False,
+            )
+        os.replace(temp_file, output_file)
+    except Exception:
+        os.remove(temp_file)
+        raise
 
     print(f"All materials saved to {output_file}")
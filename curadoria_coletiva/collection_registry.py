@@ -0,0 +1,451 @@
+import json
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
+
+import pandas as pd
+import yaml
+
+from curadoria_coletiva.catalog_store import FIELDS, LIST_FIELDS, CatalogStore
+from curadoria_coletiva.collect_materials import collect_materials
+from curadoria_coletiva.learning_paths import LearningPathGraph
+from curadoria_coletiva.material_filters import SORTABLE_FIELDS, filter_materials
+from curadoria_coletiva.memory_report import WORKER_OVERHEAD_MB
+
+if TYPE_CHECKING:
+    from curadoria_coletiva.recommendations import SimilarMaterials
+
+DEFAULT_COLLECTION = "curadoria-coletiva"
+MEMORY_BUDGET_ACTIONS = ["warn", "refuse"]
+
+# Bytes of memory a loaded catalog uses per byte of the YAML files of its materials,
+# with its similar materials built, rounded up. The synthetic catalogs of
+# `test_estimate_bounds_the_catalog_size` need about 3.4 (pandas) and 0.01 (sqlite,
+# which keeps little more than the covered subjects in memory). The cached page
+# layout is not included: it is only built on the first page request.
+CATALOG_BYTES_PER_YAML_BYTE = {"pandas": 4, "sqlite": 0.05}
+
+
+class CatalogTooLargeError(MemoryError):
+    """Raised when a catalog alone does not fit in the memory budget."""
+
+
+class Collection:
+    """
+    A curated collection of materials, with its own catalog files.
+
+    Attributes:
+        name (str): The name of the collection, used in its URLs.
+        materials_path (str): The directory with the YAML files of the materials.
+        yaml_file_path (str): Where the collected materials are saved.
+        link_status_path (str): Where `check_links` saves the link statuses.
+        catalog_db_path (str): Where the SQLite catalog is saved.
+        similar_materials_path (str): Where the similar materials matrix is saved, to
+            be extended instead of rebuilt when materials are added.
+    """
+
+    def __init__(self, name: str, materials_path: str, output_dir: str) -> None:
+        self.name = name
+        self.materials_path = materials_path
+        self.yaml_file_path = os.path.join(output_dir, "all_materials.yml")
+        self.link_status_path = os.path.join(output_dir, "link_status.json")
+        self.catalog_db_path = os.path.join(output_dir, "all_materials.db")
+        self.similar_materials_path = os.path.join(output_dir, "similar_materials.npz")
+
+
+class Catalog:
+    """
+    The loaded catalog of a collection and everything derived from it: the materials,
+    learning paths, similar materials and per-collection caches.
+
+    With the "pandas" engine the materials are kept in a DataFrame, and their learning
+    paths and similar materials are computed and kept by each worker. With the
+    "sqlite" engine all of them are computed when the SQLite catalog is written and
+    only kept there: the workers share it through the OS page cache and query it, and
+    keep nothing per material in memory.
+
+    The similar materials of the "pandas" engine are only built on first use, as
+    building them needs SciPy, which is slow to import, and the prebuilt page layout
+    does not need them.
+
+    Attributes:
+        collection (Collection): The collection the catalog belongs to.
+        df (pd.DataFrame): The materials as a DataFrame, with the "pandas" engine.
+        fields (list of str): The fields of the materials, in file order.
+        version (str): A hash that changes whenever any material changes.
+        link_status (dict): The status of each material URL whose last check failed.
+        covered_subjects (list of str): Subjects with a learning path, sorted.
+        catalog_store (CatalogStore): The SQLite catalog, with the "sqlite" engine.
+        learning_paths (LearningPathGraph): The precomputed learning paths, with the
+            "pandas" engine.
+        similar_materials (SimilarMaterials): The precomputed similar materials, with
+            the "pandas" engine.
+        cache (dict): Values computed from the catalog and reused across requests.
+        size_changed (bool): Whether something was built since `memory_size` was
+            last called.
+    """
+
+    def __init__(self, collection: Collection, catalog_engine: str) -> None:
+        self.collection = collection
+        self.version = collect_materials(
+            collection.materials_path,
+            collection.yaml_file_path,
+            collection.catalog_db_path if catalog_engine == "sqlite" else None,
+            collection.similar_materials_path,
+        )
+        self.link_status = _load_link_status(collection.link_status_path)
+
+        self.df = None
+        self.catalog_store = None
+        self.learning_paths = None
+        self._similar_materials = None
+        self._similar_materials_lock = threading.Lock()
+        if catalog_engine == "sqlite":
+            self.catalog_store = CatalogStore(collection.catalog_db_path)
+            self.fields = FIELDS
+            self.covered_subjects = self.catalog_store.covered_subjects()
+        else:
+            data = _load_yaml_data(collection.yaml_file_path)
+            self.df = _create_dataframe(data)
+            self.fields = list(self.df.columns)
+            self.learning_paths = LearningPathGraph(data)
+            self._material_urls = {
+                material["titulo"]: material["url"] for material in data
+            }
+            self.covered_subjects = self.learning_paths.covered_subjects
+        self.cache: Dict[str, Any] = {}
+        self.size_changed = False
+
+    @property
+    def similar_materials(self) -> Optional["SimilarMaterials"]:
+        if self.df is None:
+            return None
+        with self._similar_materials_lock:
+            if self._similar_materials is None:
+                from curadoria_coletiva.recommendations import build_similar_materials
+
+                materials = self.df.astype(object).where(self.df.notna(), None)
+                self._similar_materials = build_similar_materials(
+                    materials.to_dict("records"),
+                    self.collection.similar_materials_path,
+                )
+                self.size_changed = True
+        return self._similar_materials
+
+    def search(
+        self,
+        search_term: Optional[str] = None,
+        selected_subject: Optional[List[str]] = None,
+        selected_format: Optional[List[str]] = None,
+        selected_learning_style: Optional[List[str]] = None,
+        selected_language: Optional[List[str]] = None,
+        selected_level: Optional[List[str]] = None,
+        free_filter: Optional[List[str]] = None,
+        sort_column: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Filters and sorts the materials with the engine of the catalog.
+
+        Raises:
+            ValueError: If `sort_column` is not one of SORTABLE_FIELDS.
+        """
+        filters = (
+            search_term,
+            selected_subject,
+            selected_format,
+            selected_learning_style,
+            selected_language,
+            selected_level,
+            free_filter,
+            sort_column,
+        )
+        if self.catalog_store is None:
+            return filter_materials(self.df, *filters)
+
+        if sort_column and sort_column not in SORTABLE_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort_column}")
+        return pd.DataFrame(self.catalog_store.search(*filters), columns=self.fields)
+
+    def distinct_values(self, field: str) -> List[str]:
+        """Returns the sorted distinct values of an enum field or of `assuntos`."""
+        if self.catalog_store is not None:
+            return self.catalog_store.distinct_values(field)
+        values = self.df[field].explode() if field == "assuntos" else self.df[field]
+        return sorted(values.dropna().unique().tolist())
+
+    def similar(self, title: str) -> List[Dict[str, str]]:
+        """Returns the title and URL of the materials most similar to the given one."""
+        if self.catalog_store is not None:
+            return self.catalog_store.similar(title)
+        return [
+            {"titulo": similar_title, "url": self._material_urls[similar_title]}
+            for similar_title in self.similar_materials.similar(title)
+        ]
+
+    def learning_path(
+        self, subject: str, level: str, max_minutes: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the precomputed learning path to a subject, as
+        `LearningPathGraph.learning_path` does."""
+        if self.catalog_store is not None:
+            return self.catalog_store.learning_path(subject, level, max_minutes)
+        return self.learning_paths.learning_path(subject, level, max_minutes)
+
+    def memory_size(self) -> int:
+        """Estimates the memory used by the catalog and its caches, in bytes."""
+        self.size_changed = False
+        size = _deep_size([self.covered_subjects, self.link_status, self.cache])
+        if self.df is not None:
+            size += self.df.memory_usage(deep=True).sum()
+            size += _deep_size([self.learning_paths.paths, self._material_urls])
+        if self._similar_materials is not None:
+            size += self._similar_materials.memory_size()
+        return int(size)
+
+
+class CollectionRegistry:
+    """
+    The registered collections, whose catalogs are loaded on first use and kept in
+    least-recently-used order.
+
+    Whenever the estimated memory of the loaded catalogs, including what they cache,
+    goes over the budget, the least recently used ones are unloaded until it fits
+    again. Pinned catalogs and the catalog just requested are never unloaded: if the
+    latter alone does not fit, it is either kept with a warning or refused, depending
+    on `over_budget_action`. To refuse a catalog without building it first, its
+    memory is estimated beforehand from the size of the YAML files of its materials.
+
+    Each collection is loaded under its own lock, so loading one collection does not
+    block requests to the others.
+
+    Attributes:
+        memory_budget_bytes (int): Memory the loaded catalogs may use together.
+        catalog_engine (str): The engine used by the catalogs ("pandas" or "sqlite").
+        over_budget_action (str): What to do with a catalog that alone does not fit
+            in the budget: "warn" keeps it loaded, "refuse" raises an error.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        catalog_engine: str = "pandas",
+        over_budget_action: str = "warn",
+    ) -> None:
+        if over_budget_action not in MEMORY_BUDGET_ACTIONS:
+            raise ValueError(f"Unknown over budget action: {over_budget_action}")
+        self.memory_budget_bytes = memory_budget_bytes
+        self.catalog_engine = catalog_engine
+        self.over_budget_action = over_budget_action
+        self._collections: Dict[str, Collection] = {}
+        self._pinned: Set[str] = set()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._catalogs: "OrderedDict[str, Catalog]" = OrderedDict()
+        self._catalog_sizes: Dict[str, int] = {}
+        # Guards `_catalogs` and `_catalog_sizes`; never held while loading a catalog.
+        self._lock = threading.Lock()
+
+    def register(self, collection: Collection, pinned: bool = False) -> None:
+        """Registers a collection. The catalog of a pinned collection is never
+        unloaded, e.g. because the app keeps references to it anyway."""
+        if collection.name in self._collections:
+            raise ValueError(f"Duplicated collection: {collection.name}")
+        self._collections[collection.name] = collection
+        self._load_locks[collection.name] = threading.Lock()
+        if pinned:
+            self._pinned.add(collection.name)
+
+    def names(self) -> List[str]:
+        return list(self._collections)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._collections
+
+    def get(self, name: str) -> Catalog:
+        """Returns the catalog of a collection, loading it if needed.
+
+        Raises:
+            KeyError: If there is no collection with that name.
+            CatalogTooLargeError: If the catalog alone does not fit in the memory
+                budget and `over_budget_action` is "refuse".
+        """
+        collection = self._collections[name]
+
+        catalog = self._loaded(name)
+        if catalog is not None:
+            if catalog.size_changed:
+                # Something was built on first use since the catalog was measured.
+                self._measure(name, catalog)
+            return catalog
+
+        with self._load_locks[name]:
+            # Another request may have loaded it while this one waited for the lock.
+            catalog = self._loaded(name)
+            if catalog is not None:
+                return catalog
+
+            if self.over_budget_action == "refuse":
+                self._check_budget(
+                    name,
+                    estimate_catalog_size(collection, self.catalog_engine),
+                    estimated=True,
+                )
+
+            catalog = Catalog(collection, self.catalog_engine)
+            catalog_size = catalog.memory_size()
+            self._check_budget(name, catalog_size)
+
+            with self._lock:
+                self._catalogs[name] = catalog
+                self._catalog_sizes[name] = catalog_size
+                self._evict(keep=name)
+            return catalog
+
+    def cached(self, name: str, key: str, build: Callable[[Catalog], Any]) -> Any:
+        """Returns a value built from the catalog of a collection, building it on
+        first use and caching it with the catalog. The memory of cached values counts
+        towards the budget, so caching a large value may unload other catalogs."""
+        catalog = self.get(name)
+        if key in catalog.cache:
+            return catalog.cache[key]
+
+        with self._load_locks[name]:
+            if key not in catalog.cache:
+                catalog.cache[key] = build(catalog)
+                self._measure(name, catalog)
+        return catalog.cache[key]
+
+    def loaded_memory_size(self) -> int:
+        """Returns the estimated memory used by the loaded catalogs, in bytes."""
+        return sum(self._catalog_sizes.values())
+
+    def _measure(self, name: str, catalog: Catalog) -> None:
+        """Updates the memory used by a loaded catalog, unloading others if it no
+        longer fits in the budget."""
+        catalog_size = catalog.memory_size()
+        with self._lock:
+            if name in self._catalogs:
+                self._catalog_sizes[name] = catalog_size
+                self._evict(keep=name)
+
+    def _loaded(self, name: str) -> Optional[Catalog]:
+        with self._lock:
+            catalog = self._catalogs.get(name)
+            if catalog is not None:
+                self._catalogs.move_to_end(name)
+            return catalog
+
+    def _check_budget(
+        self, name: str, catalog_size: int, estimated: bool = False
+    ) -> None:
+        """Warns or raises, depending on `over_budget_action`, if a catalog alone
+        does not fit in the memory budget."""
+        if catalog_size <= self.memory_budget_bytes:
+            return
+
+        message = (
+            f"Catalog of collection {name} needs "
+            f"{'an estimated ' if estimated else ''}{_megabytes(catalog_size)} MB, "
+            f"over the memory budget of {_megabytes(self.memory_budget_bytes)} MB"
+        )
+        if self.over_budget_action == "refuse":
+            raise CatalogTooLargeError(message)
+        print(f"Warning: {message}")
+
+    def _evict(self, keep: str) -> None:
+        for name in list(self._catalogs):
+            if self.loaded_memory_size() <= self.memory_budget_bytes:
+                break
+            if name == keep or name in self._pinned:
+                continue
+            del self._catalogs[name]
+            del self._catalog_sizes[name]
+            print(f"Collection {name} unloaded to stay within the memory budget")
+
+
+def discover_collections(collections_dir: str) -> List[Collection]:
+    """Finds the collections in a directory: each subdirectory with a `materials`
+    directory is a collection named after the subdirectory."""
+    if not os.path.isdir(collections_dir):
+        return []
+
+    collections = []
+    for name in sorted(os.listdir(collections_dir)):
+        collection_dir = os.path.join(collections_dir, name)
+        materials_path = os.path.join(collection_dir, "materials")
+        if os.path.isdir(materials_path):
+            collections.append(Collection(name, materials_path, collection_dir))
+    return collections
+
+
+def estimate_catalog_size(collection: Collection, catalog_engine: str) -> int:
+    """Estimates the memory the catalog of a collection will use once loaded, in
+    bytes, from the size of the YAML files of its materials, without reading them."""
+    yaml_size = sum(
+        os.path.getsize(os.path.join(collection.materials_path, filename))
+        for filename in os.listdir(collection.materials_path)
+        if filename.lower().endswith((".yml", ".yaml"))
+    )
+    return int(yaml_size * CATALOG_BYTES_PER_YAML_BYTE[catalog_engine])
+
+
+def default_memory_budget_mb(machine_memory_mb: int, workers: int) -> int:
+    """Returns the memory the catalogs of all workers may use together on a machine:
+    what is left of it once every worker has its WORKER_OVERHEAD_MB."""
+    return max(0, machine_memory_mb - WORKER_OVERHEAD_MB * workers)
+
+
+def _deep_size(obj: Any) -> int:
+    """Estimates the memory of an object and of everything it references: containers,
+    strings and the attributes of objects such as Dash components. Objects referenced
+    more than once are only counted once."""
+    seen: Set[int] = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, types.ModuleType)):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") and not callable(current):
+            stack.append(current.__dict__)
+    return size
+
+
+def _megabytes(size_bytes):
+    return f"{size_bytes / (1024 * 1024):.1f}"
+
+
+def _load_yaml_data(file_path):
+    """Loads the collected materials. List fields a material leaves out, like
+    `comentarios` and `prerequisitos`, which default to empty, become empty lists, so
+    the rest of the app never gets a missing value where it expects a list."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        data = yaml.safe_load(file) or []
+    for material in data:
+        for field in LIST_FIELDS:
+            if material.get(field) is None:
+                material[field] = []
+    return data
+
+
+def _load_link_status(file_path):
+    """Loads the statuses saved by `check_links` of the links whose last check failed,
+    the only ones the app shows, if links were ever checked."""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, "r", encoding="utf-8") as file:
+        link_status = json.load(file)
+    return {url: status for url, status in link_status.items() if not status["ok"]}
+
+
+def _create_dataframe(data):
+    return pd.DataFrame(data)
@@ -0,0 +1,68 @@
+import glob
+import hashlib
+import os
+from typing import List
+
+import flask
+
+LAYOUT_CACHE_MAX_AGE_SECONDS = 300
+
+
+def layout_version(catalog_version: str, *inputs: str) -> str:
+    """Returns the version of the page layout: it changes whenever the catalog or any
+    other input of the layout (e.g. the code that builds it) changes."""
+    content = "\0".join((catalog_version,) + inputs)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def package_sources(package_dir: str) -> List[str]:
+    """Returns the source of every module of a package, in file name order. The layout
+    is built by code spread across several modules (cards, learning paths, similar
+    materials, collections), so all of them are inputs of the layout."""
+    sources = []
+    for file_path in sorted(glob.glob(os.path.join(package_dir, "*.py"))):
+        with open(file_path, "r", encoding="utf-8") as file:
+            sources.append(file.read())
+    return sources
+
+
+def layout_file_path(build_dir: str, version: str) -> str:
+    return os.path.join(build_dir, f"layout-{version}.json")
+
+
+def build_layout_file(layout, file_path: str) -> None:
+    """Serializes a Dash layout to the JSON served by the `_dash-layout` endpoint."""
+    from plotly.io.json import to_json_plotly
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(to_json_plotly(layout))
+
+    print(f"Layout saved to {file_path}")
+
+
+def serve_layout_file(app, file_path: str, version: str) -> None:
+    """Serves a prebuilt layout file in place of the layout Dash would build.
+
+    The file is read once and sent as is, with an ETag and a Cache-Control header so
+    browsers and CDNs can cache it until the layout version changes.
+    """
+    with open(file_path, "rb") as file:
+        content = file.read()
+
+    layout_path = f"{app.config.routes_pathname_prefix}_dash-layout"
+
+    @app.server.before_request
+    def _serve_cached_layout():
+        if flask.request.path != layout_path:
+            return None
+
+        if flask.request.if_none_match.contains(version):
+            response = flask.Response(status=304)
+        else:
+            response = flask.Response(content, mimetype="application/json")
+        response.set_etag(version)
+        response.cache_control.public = True
+        response.cache_control.max_age = LAYOUT_CACHE_MAX_AGE_SECONDS
+        return response
@@ -0,0 +1,335 @@
+import heapq
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from curadoria_coletiva.enums import DifficultyEnum
+
+DIFFICULTY_LEVELS = [level.value for level in DifficultyEnum]
+
+# A plan is the materials (by index) that cover a subject and all of its
+# prerequisites, ordered so that prerequisites come first, plus the prerequisite
+# subjects no material covers, which are assumed to be already known.
+Plan = Tuple[Tuple[int, ...], FrozenSet[str]]
+
+# Fields of the materials a path keeps: the ones shown when listing it.
+PATH_MATERIAL_FIELDS = ["titulo", "url", "nivel_dificuldade", "minutos_necessarios"]
+
+# Most sets of materials the exact search looks at for one subject and level. Past it,
+# the path found by `_best_plans`, which may cost more, is kept.
+SEARCH_STATE_LIMIT = 20000
+
+
+class LearningPathGraph:
+    """
+    Subject dependency graph built from the `assuntos` and `prerequisitos` of the
+    materials, with the cheapest learning path to every subject precomputed for every
+    difficulty level.
+
+    A material covering subject S with prerequisite P adds the edge P -> S. A path to
+    a subject is the set of materials, with difficulty up to the chosen level, that
+    covers the subject and, recursively, the prerequisites of the chosen materials with
+    the fewest total `minutos_necessarios`, listed so that every material comes after
+    the materials covering its prerequisites.
+
+    Since materials covering several subjects can be shared by the paths to different
+    prerequisites, the cheapest path is found by a search over sets of materials,
+    bounded by the path `_best_plans` finds quickly. It is exact unless the search
+    looks at more than SEARCH_STATE_LIMIT sets, in which case the bounding path is
+    kept.
+
+    Attributes:
+        subjects (list of str): All subjects, the position being the subject index.
+        covered_subjects (list of str): Subjects covered by at least one material.
+        prerequisites (list of list of int): Prerequisite subjects of each subject.
+        dependents (list of list of int): Subjects depending on each subject.
+        paths (dict): Precomputed path for each (subject, level) pair.
+    """
+
+    def __init__(self, materials: List[Dict[str, Any]]) -> None:
+        self.materials = materials
+        self.subjects = sorted(
+            {
+                subject
+                for material in materials
+                for field in ("assuntos", "prerequisitos")
+                for subject in material.get(field) or []
+            }
+        )
+        self._subject_index = {subject: i for i, subject in enumerate(self.subjects)}
+
+        self._materials_by_subject: List[List[int]] = [[] for _ in self.subjects]
+        prerequisites: List[Set[int]] = [set() for _ in self.subjects]
+        for i, material in enumerate(materials):
+            for subject in material.get("assuntos") or []:
+                subject_index = self._subject_index[subject]
+                self._materials_by_subject[subject_index].append(i)
+                for prerequisite in _own_prerequisites(material):
+                    prerequisites[subject_index].add(self._subject_index[prerequisite])
+
+        self.covered_subjects = [
+            subject
+            for subject, material_indexes in zip(self.subjects, self._materials_by_subject)
+            if material_indexes
+        ]
+        self.prerequisites = [sorted(edges) for edges in prerequisites]
+        self.dependents: List[List[int]] = [[] for _ in self.subjects]
+        for subject, edges in enumerate(self.prerequisites):
+            for prerequisite in edges:
+                self.dependents[prerequisite].append(subject)
+
+        self._assumed_subjects = set(self.subjects) - set(self.covered_subjects)
+
+        self.paths: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        for level_rank, level in enumerate(DIFFICULTY_LEVELS):
+            plans = self._best_plans(level_rank)
+            coverers = self._coverers(level_rank)
+            for subject in self.covered_subjects:
+                plan = plans.get(subject)
+                if plan is not None:
+                    plan = self._cheapest_plan(subject, coverers, plan)
+                self.paths[(subject, level)] = self._describe(plan)
+
+        # The paths keep what they show of the materials they list; the materials are
+        # no longer needed.
+        del self.materials
+
+    def learning_path(
+        self, subject: str, level: str, max_minutes: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the precomputed cheapest path to a subject using materials up to
+        the given difficulty level, or None if there is no such path within
+        `max_minutes`."""
+        path = self.paths.get((subject, level))
+        if path is None or (max_minutes is not None and path["minutos"] > max_minutes):
+            return None
+        return path
+
+    def _best_plans(self, level_rank: int) -> Dict[str, Plan]:
+        """Finds a plan for every subject that has one, using materials up to the given
+        difficulty level, quickly but not always the cheapest.
+
+        This is Knuth's generalization of Dijkstra's algorithm: a material becomes
+        usable once each of its prerequisites has a plan, and subjects get their plans
+        in increasing order of minutes. A prerequisite cycle can therefore never make a
+        subject depend on itself, and each material is only combined once. Combining
+        the cheapest plan of each prerequisite misses plans where a material more
+        expensive on its own is shared by several prerequisites, so the result is only
+        used to bound `_cheapest_plan`.
+
+        Subjects no material covers are assumed to be already known. Subjects only
+        covered by materials above the level, or whose materials all depend on such
+        subjects, get no plan.
+        """
+        plans: Dict[str, Plan] = {
+            subject: ((), frozenset({subject}))
+            for subject, material_indexes in zip(self.subjects, self._materials_by_subject)
+            if not material_indexes
+        }
+        heap: List[Tuple[int, int, str, Plan]] = []
+        missing_prerequisites: Dict[int, int] = {}
+        materials_by_prerequisite: Dict[str, List[int]] = {}
+
+        def push(material_index: int) -> None:
+            plan = self._plan_with_material(material_index, plans)
+            minutes = self._minutes(plan)
+            for subject in self.materials[material_index]["assuntos"]:
+                if subject not in plans:
+                    heapq.heappush(heap, (minutes, material_index, subject, plan))
+
+        for i, material in enumerate(self.materials):
+            if _difficulty_rank(material) > level_rank:
+                continue
+            missing = [p for p in _own_prerequisites(material) if p not in plans]
+            if not missing:
+                push(i)
+                continue
+            missing_prerequisites[i] = len(missing)
+            for prerequisite in missing:
+                materials_by_prerequisite.setdefault(prerequisite, []).append(i)
+
+        while heap:
+            _, _, subject, plan = heapq.heappop(heap)
+            if subject in plans:
+                continue
+            plans[subject] = plan
+            for i in materials_by_prerequisite.get(subject, []):
+                missing_prerequisites[i] -= 1
+                if missing_prerequisites[i] == 0:
+                    push(i)
+
+        return plans
+
+    def _coverers(self, level_rank: int) -> Dict[str, List[int]]:
+        """Returns the materials up to the given difficulty level that cover each
+        subject, cheapest first. Of materials with the same subjects and prerequisites
+        only the cheapest is kept: the others can never make a path cheaper."""
+        cheapest: Dict[Tuple[FrozenSet[str], FrozenSet[str]], int] = {}
+        for i, material in enumerate(self.materials):
+            if _difficulty_rank(material) > level_rank:
+                continue
+            key = (
+                frozenset(material.get("assuntos") or []),
+                frozenset(_own_prerequisites(material)),
+            )
+            if key not in cheapest or self._material_minutes(i) < self._material_minutes(
+                cheapest[key]
+            ):
+                cheapest[key] = i
+
+        coverers: Dict[str, List[int]] = {}
+        for i in sorted(cheapest.values()):
+            for subject in self.materials[i]["assuntos"]:
+                coverers.setdefault(subject, []).append(i)
+        for material_indexes in coverers.values():
+            material_indexes.sort(key=lambda i: (self._material_minutes(i), i))
+        return coverers
+
+    def _cheapest_plan(
+        self, subject: str, coverers: Dict[str, List[int]], bound: Plan
+    ) -> Plan:
+        """Finds the cheapest plan for a subject with an A* search over sets of
+        materials, returning `bound` if no plan is cheaper or if the search looks at
+        more than SEARCH_STATE_LIMIT sets.
+
+        A set is extended with a material covering a subject it still needs: one no
+        material of the set covers or, when the materials of the set depend on each
+        other in a cycle, one none of them can be ordered to provide. What completing a
+        set costs is at least the cheapest material covering the subject it lacks that
+        is most expensive to cover.
+        """
+        bound_minutes = self._minutes(bound)
+        start: FrozenSet[int] = frozenset()
+        heap = [(0, 0, (), start)]
+        seen = {start}
+        while heap and len(seen) <= SEARCH_STATE_LIMIT:
+            _, minutes, _, state = heapq.heappop(heap)
+            placed, providers = self._place(state)
+            needed = self._needed_subjects(subject, state)
+            if len(placed) == len(state) and subject in providers:
+                return self._plan_from_providers(subject, providers)
+
+            uncovered = needed - {s for i in state for s in self.materials[i]["assuntos"]}
+            if uncovered:
+                # Every plan from this set needs a new material for each subject no
+                # material of it covers: branching on one of them is enough.
+                branch_subjects = [min(uncovered, key=lambda s: (len(coverers[s]), s))]
+            else:
+                branch_subjects = sorted(needed - set(providers))
+
+            for branch_subject in branch_subjects:
+                for i in coverers[branch_subject]:
+                    next_state = state | {i}
+                    if next_state in seen:
+                        continue
+                    seen.add(next_state)
+                    next_minutes = minutes + self._material_minutes(i)
+                    estimate = next_minutes + self._missing_minutes(
+                        subject, next_state, coverers
+                    )
+                    if estimate < bound_minutes:
+                        heapq.heappush(
+                            heap,
+                            (estimate, next_minutes, tuple(sorted(next_state)), next_state),
+                        )
+        return bound
+
+    def _needed_subjects(self, subject: str, state: FrozenSet[int]) -> Set[str]:
+        """The subject and the prerequisites of a set of materials, except those no
+        material covers, which are assumed to be already known."""
+        needed = {subject}
+        for i in state:
+            needed.update(_own_prerequisites(self.materials[i]))
+        return needed - self._assumed_subjects
+
+    def _missing_minutes(
+        self, subject: str, state: FrozenSet[int], coverers: Dict[str, List[int]]
+    ) -> float:
+        """A lower bound of the minutes needed to complete a set of materials, or
+        infinity if a subject it needs has no material up to the level."""
+        covered = {s for i in state for s in self.materials[i]["assuntos"]}
+        uncovered = self._needed_subjects(subject, state) - covered
+        if any(s not in coverers for s in uncovered):
+            return float("inf")
+        return max(
+            (self._material_minutes(coverers[s][0]) for s in uncovered), default=0
+        )
+
+    def _place(self, state: FrozenSet[int]) -> Tuple[List[int], Dict[str, int]]:
+        """Orders the materials of a set so that each comes after materials covering
+        its prerequisites, leaving out those that can never be. Returns the ordered
+        materials and, for each subject they cover, the first of them covering it."""
+        placed: List[int] = []
+        providers: Dict[str, int] = {}
+        remaining = sorted(state)
+        progress = True
+        while remaining and progress:
+            progress = False
+            for i in list(remaining):
+                prerequisites = _own_prerequisites(self.materials[i])
+                if all(
+                    p in providers or p in self._assumed_subjects for p in prerequisites
+                ):
+                    placed.append(i)
+                    remaining.remove(i)
+                    for subject in self.materials[i]["assuntos"]:
+                        providers.setdefault(subject, i)
+                    progress = True
+        return placed, providers
+
+    def _plan_from_providers(self, subject: str, providers: Dict[str, int]) -> Plan:
+        """Lists the materials a subject needs, prerequisites first, given the material
+        providing each subject."""
+        material_indexes: Dict[int, None] = {}
+        assumed: Set[str] = set()
+
+        def visit(current: str) -> None:
+            if current not in providers:
+                assumed.add(current)
+                return
+            material_index = providers[current]
+            if material_index in material_indexes:
+                return
+            for prerequisite in sorted(_own_prerequisites(self.materials[material_index])):
+                visit(prerequisite)
+            material_indexes[material_index] = None
+
+        visit(subject)
+        return tuple(material_indexes), frozenset(assumed)
+
+    def _plan_with_material(self, material_index: int, plans: Dict[str, Plan]) -> Plan:
+        """Combines a material with the plans of its prerequisites, which come first."""
+        material_indexes: Dict[int, None] = {}
+        assumed: Set[str] = set()
+        for prerequisite in sorted(_own_prerequisites(self.materials[material_index])):
+            plan = plans[prerequisite]
+            material_indexes.update(dict.fromkeys(plan[0]))
+            assumed.update(plan[1])
+        material_indexes[material_index] = None
+        return tuple(material_indexes), frozenset(assumed)
+
+    def _minutes(self, plan: Plan) -> int:
+        return sum(self._material_minutes(i) for i in plan[0])
+
+    def _material_minutes(self, material_index: int) -> int:
+        return self.materials[material_index]["minutos_necessarios"]
+
+    def _describe(self, plan: Optional[Plan]) -> Optional[Dict[str, Any]]:
+        if plan is None:
+            return None
+
+        return {
+            "materiais": [
+                {field: self.materials[i].get(field) for field in PATH_MATERIAL_FIELDS}
+                for i in plan[0]
+            ],
+            "minutos": self._minutes(plan),
+            "conhecimentos_previos": sorted(plan[1]),
+        }
+
+
+def _own_prerequisites(material: Dict[str, Any]) -> Set[str]:
+    """Prerequisites of a material that the material itself does not cover."""
+    return set(material.get("prerequisitos") or []) - set(material.get("assuntos") or [])
+
+
+def _difficulty_rank(material: Dict[str, Any]) -> int:
+    return DIFFICULTY_LEVELS.index(material["nivel_dificuldade"])
@@ -0,0 +1,100 @@
+# Fields the materials can be sorted by: the scalar ones, whose values compare with
+# each other (unlike the comments, which are dicts). Links are not worth sorting by.
+SORTABLE_FIELDS = [
+    "titulo",
+    "autoria",
+    "formato",
+    "minutos_necessarios",
+    "ritmo",
+    "estilo_aprendizagem",
+    "idioma",
+    "nivel_dificuldade",
+    "eh_gratuito",
+]
+
+
+def search_text(material):
+    """Returns the text the search term is matched against: every field of the
+    material, as text, one per line. Missing values and empty lists are left out, so
+    materials read from the YAML files, the DataFrame or the SQLite catalog give the
+    same text."""
+    return "\n".join(
+        str(material[field])
+        for field in sorted(material)
+        if not _is_missing(material[field])
+    )
+
+
+def matches_search_term(text, search_term):
+    """Whether the search term appears in a text, literally and ignoring case."""
+    return search_term.upper() in text.upper()
+
+
+def filter_materials(
+    df,
+    search_term=None,
+    selected_subject=None,
+    selected_format=None,
+    selected_learning_style=None,
+    selected_language=None,
+    selected_level=None,
+    free_filter=None,
+    sort_column=None,
+):
+    """Filters and sorts the materials DataFrame.
+
+    Shared by the Dash search and the JSON API, so both always return the same results.
+    The search term is matched literally, as a case-insensitive substring of the
+    `search_text` of each material, as the SQLite catalog does.
+
+    Raises:
+        ValueError: If `sort_column` is not one of SORTABLE_FIELDS.
+    """
+    if sort_column and sort_column not in SORTABLE_FIELDS:
+        raise ValueError(f"Unknown sort field: {sort_column}")
+
+    filtered_df = df
+
+    # Aplicar os filtros
+    if search_term:
+        filtered_df = filtered_df.loc[
+            [
+                matches_search_term(search_text(material), search_term)
+                for material in filtered_df.to_dict("records")
+            ]
+        ]
+
+    if selected_subject:
+        filtered_df = filtered_df[
+            filtered_df["assuntos"].apply(
+                lambda x: all(cat in x for cat in selected_subject)
+            )
+        ]
+
+    if selected_format:
+        filtered_df = filtered_df[filtered_df["formato"].isin(selected_format)]
+
+    if selected_learning_style:
+        filtered_df = filtered_df[filtered_df["estilo_aprendizagem"].isin(selected_learning_style)]
+
+    if selected_language:
+        filtered_df = filtered_df[filtered_df["idioma"].isin(selected_language)]
+
+    if selected_level:
+        filtered_df = filtered_df[filtered_df["nivel_dificuldade"].isin(selected_level)]
+
+    if free_filter:
+        filtered_df = filtered_df[filtered_df["eh_gratuito"] == True]
+
+    # Aplicar ordenação se selecionada
+    if sort_column:
+        filtered_df = filtered_df.sort_values(by=sort_column)
+
+    return filtered_df
+
+
+def _is_missing(value):
+    if isinstance(value, (list, tuple, set)):
+        return not value
+    # NaN is the only value not equal to itself.
+    return value is None or value != value
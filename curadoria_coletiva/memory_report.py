@@ -0,0 +1,233 @@
+import importlib
+import os
+import subprocess
+import sys
+import tracemalloc
+from typing import Dict, List, Tuple
+
+DEFAULT_MACHINE_MEMORY_MB = 1024  # Memory of the VM in fly.toml
+# Memory a gunicorn worker uses besides its catalogs: the interpreter, Dash, pandas,
+# SciPy and the requests being answered. `memory_report` measures it; it was 108 MB
+# with the two example materials, rounded up here.
+WORKER_OVERHEAD_MB = 128
+
+TOP_ALLOCATIONS = 10
+
+_KB = 1024
+_MB = 1024 * 1024
+
+_PEAK_RSS_SCRIPT = """
+import resource
+{setup}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+{statement}
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(before, after)
+"""
+
+
+def memory_report(
+    materials_path: str,
+    output_file: str,
+    report_file: str,
+    workers: int = 1,
+    machine_memory_mb: int = DEFAULT_MACHINE_MEMORY_MB,
+) -> int:
+    """Measures how much memory the app uses for the current catalog and estimates
+    how much a machine running `workers` gunicorn workers needs.
+
+    The report written to `report_file` has:
+
+    - The peak RSS of `collect_materials` and of a worker after importing the app
+      and answering an unfiltered `update_table` request, each measured in a fresh
+      interpreter, and what the worker uses besides its catalog.
+    - The deep memory usage of each column of the materials DataFrame.
+    - The memory allocated, according to `tracemalloc`, to build the page layout and
+      to answer an unfiltered `update_table` request, along with the lines that
+      allocated the most.
+
+    Args:
+        materials_path (str): The directory with the YAML files of the materials.
+        output_file (str): Where `collect_materials` saves the collected materials.
+        report_file (str): Where to write the report.
+        workers (int): The number of gunicorn workers.
+        machine_memory_mb (int): The memory of the machine, in megabytes.
+
+    Returns:
+        int: The estimated memory, in bytes, the workers need together.
+    """
+    collect_before, collect_peak = _peak_rss(
+        "from curadoria_coletiva.collect_materials import collect_materials",
+        f"collect_materials({materials_path!r}, {output_file!r})",
+    )
+    worker_before, worker_peak = _peak_rss(
+        "",
+        "import curadoria_coletiva.app as app_module\n"
+        "from curadoria_coletiva.memory_report import _request_unfiltered_results\n"
+        "_request_unfiltered_results(app_module.app)",
+    )
+    needed = worker_peak * workers
+
+    app_module = importlib.import_module("curadoria_coletiva.app")
+    catalog = app_module.default_catalog
+    column_sizes = dataframe_memory_usage(catalog.df) if catalog.df is not None else {}
+    layout_peak, layout_allocations = _traced(
+        lambda: app_module._create_layout(catalog)
+    )
+    # The first request imports what Flask and Dash need to answer it; do it before
+    # tracing so only the memory of the request itself is measured.
+    _request_unfiltered_results(app_module.app)
+    update_peak, update_allocations = _traced(
+        lambda: _request_unfiltered_results(app_module.app)
+    )
+
+    lines = [
+        f"Estimated memory for {workers} worker(s): {needed / _MB:.1f} MB "
+        f"(machine: {machine_memory_mb} MB)",
+        "",
+        f"Peak RSS of collect_materials: {collect_peak / _MB:.1f} MB "
+        f"({collect_before / _MB:.1f} MB before collecting)",
+        f"Peak RSS of a worker: {worker_peak / _MB:.1f} MB "
+        f"({worker_before / _MB:.1f} MB before importing the app)",
+        f"Worker overhead besides the catalog: "
+        f"{(worker_peak - catalog.memory_size()) / _MB:.1f} MB "
+        f"(WORKER_OVERHEAD_MB: {WORKER_OVERHEAD_MB} MB)",
+        "",
+    ]
+    if catalog.df is None:
+        lines.append("Materials DataFrame: none, the materials are in the SQLite catalog")
+    else:
+        lines.append(
+            f"Materials DataFrame ({len(catalog.df)} materials): "
+            f"{sum(column_sizes.values()) / _KB:.1f} KB"
+        )
+    lines.extend(
+        f"{size / _KB:10.1f} KB  {column}"
+        for column, size in sorted(column_sizes.items(), key=lambda item: -item[1])
+    )
+    if catalog.similar_materials is not None:
+        lines.append(
+            f"Similar materials: {catalog.similar_materials.memory_size() / _KB:.1f} KB"
+        )
+    lines.append("")
+    lines.extend(_allocations_section("Page layout", layout_peak, layout_allocations))
+    lines.append("")
+    lines.extend(
+        _allocations_section("update_table request", update_peak, update_allocations)
+    )
+
+    with open(report_file, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+    print(
+        f"Estimated memory for {workers} worker(s): {needed / _MB:.1f} MB. "
+        f"Report saved to {report_file}"
+    )
+    return needed
+
+
+def dataframe_memory_usage(df) -> Dict[str, int]:
+    """Returns the memory used by each column of a DataFrame, in bytes, counting
+    the objects the column references (strings, lists, dicts)."""
+    return {column: int(size) for column, size in df.memory_usage(deep=True).items()}
+
+
+def _peak_rss(setup: str, statement: str) -> Tuple[int, int]:
+    """Runs a statement in a fresh interpreter and returns its peak RSS, in bytes,
+    before and after running the statement."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _PEAK_RSS_SCRIPT.format(setup=setup, statement=statement),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Error running {statement}:\n{result.stderr}")
+
+    before, after = result.stdout.splitlines()[-1].split()
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    unit = 1 if sys.platform == "darwin" else 1024
+    return int(before) * unit, int(after) * unit
+
+
+def _traced(function) -> Tuple[int, List[tracemalloc.StatisticDiff]]:
+    """Calls a function with `tracemalloc` on and returns the peak memory it traced,
+    in bytes, and the lines that allocated the most while the result was alive."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    allocations = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+    return peak, allocations
+
+
+def _request_unfiltered_results(app):
+    """Requests the first page of results with no filters from `update_table`."""
+    filters = [
+        "search-box",
+        "subject-dropdown",
+        "format-dropdown",
+        "learning-style-dropdown",
+        "language-dropdown",
+        "level-dropdown",
+        "free-filter",
+        "sort-dropdown",
+    ]
+    return app.server.test_client().post(
+        "/_dash-update-component",
+        json={
+            "output": (
+                "..results.children...results-section-title.children..."
+                "show-more-button.style...results-limit.data.."
+            ),
+            "outputs": [
+                {"id": "results", "property": "children"},
+                {"id": "results-section-title", "property": "children"},
+                {"id": "show-more-button", "property": "style"},
+                {"id": "results-limit", "property": "data"},
+            ],
+            "inputs": [
+                {"id": component_id, "property": "value", "value": None}
+                for component_id in filters
+            ]
+            + [{"id": "show-more-button", "property": "n_clicks", "value": 0}],
+            "state": [{"id": "results-limit", "property": "data", "value": None}],
+            "changedPropIds": [],
+        },
+    )
+
+
+def _allocations_section(title, peak, allocations):
+    lines = [f"{title}: peak of {peak / _KB:.1f} KB traced"]
+    lines.extend(
+        f"{allocation.size_diff / _KB:10.1f} KB  {allocation.traceback}"
+        for allocation in allocations
+    )
+    return lines
+
+
+if __name__ == "__main__":
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    machine_memory_mb = int(
+        os.environ.get("MACHINE_MEMORY_MB", DEFAULT_MACHINE_MEMORY_MB)
+    )
+    needed = memory_report(
+        "curadoria_coletiva/materials",
+        "curadoria_coletiva/all_materials.yml",
+        "memory_report.txt",
+        workers,
+        machine_memory_mb,
+    )
+    if needed > machine_memory_mb * _MB:
+        print(
+            f"{workers} worker(s) need {needed / _MB:.1f} MB, "
+            f"over the {machine_memory_mb} MB of the machine"
+        )
+        sys.exit(1)
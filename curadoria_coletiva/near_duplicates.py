@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Query parameters that only track where a click came from and never change
+# the resource being linked.
+_TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref", "si"}
+
+
+def _permutation_coefficients() -> List[Tuple[int, int]]:
+    """Derives deterministic (a, b) pairs for the MinHash permutations, so
+    signatures persisted by one run can be compared with the next one."""
+    coefficients = []
+    for i in range(NUM_PERMUTATIONS):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE_PRIME
+        coefficients.append((a, b))
+    return coefficients
+
+
+_PERMUTATIONS = _permutation_coefficients()
+
+
+def normalize_url(url: str) -> str:
+    """Normalizes a URL so that trivially different links to the same
+    resource compare equal.
+
+    Lowercases scheme and host, drops a leading 'www.', default ports,
+    fragments, trailing slashes and tracking parameters (utm_* and friends),
+    and sorts the remaining query parameters.
+
+    Raises:
+        ValueError: If the URL cannot be parsed, e.g. it has a non-numeric port.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError as e:
+        raise ValueError(f"Invalid URL {url}: {e}") from e
+
+    scheme = (parts.scheme or "http").lower()
+    if scheme == "http":
+        scheme = "https"
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+            and key.lower() not in _TRACKING_PARAMS
+        )
+    )
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def _normalize_text(text: str) -> str:
+    """Lowercases, strips accents and collapses punctuation and whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _shingles(text: str) -> Set[str]:
+    """Returns the character shingles of a normalized text."""
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(material_data: Dict[str, Any]) -> List[int]:
+    """Computes the MinHash signature over the title and author of a material."""
+    text = _normalize_text(
+        f"{material_data.get('titulo') or ''} {material_data.get('autoria') or ''}"
+    )
+    hashed_shingles = [
+        int.from_bytes(
+            hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big"
+        )
+        for shingle in _shingles(text)
+    ]
+
+    return [
+        min((a * value + b) % _MERSENNE_PRIME for value in hashed_shingles)
+        & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(signature: List[int], other: List[int]) -> float:
+    """Estimates the Jaccard similarity of two materials from their signatures."""
+    matches = sum(1 for a, b in zip(signature, other) if a == b)
+    return matches / NUM_PERMUTATIONS
+
+
+def _material_key(material_data: Dict[str, Any]) -> str:
+    return f"{material_data.get('file_path', '')}::{material_data.get('titulo', '')}"
+
+
+def _material_fingerprint(material_data: Dict[str, Any]) -> str:
+    """Hashes the fields the index depends on, to detect edited materials."""
+    fields = [material_data.get(field) or "" for field in ("titulo", "autoria", "url")]
+    return hashlib.blake2b("\0".join(fields).encode(), digest_size=8).hexdigest()
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures and normalized
+    URLs of materials.
+
+    Each signature is split into bands and each band is hashed into a bucket,
+    so a lookup only compares a material against the few candidates sharing
+    at least one bucket instead of against the whole catalog.
+
+    Attributes:
+        signatures (dict): Signature of each indexed material, by material key.
+        titles (dict): Title of each indexed material, by material key.
+        fingerprints (dict): Fingerprint of each indexed material, by material key.
+        urls (dict): Material key of each indexed normalized URL.
+        buckets (dict): Material keys in each LSH bucket.
+    """
+
+    def __init__(self) -> None:
+        self.signatures: Dict[str, List[int]] = {}
+        self.titles: Dict[str, str] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.urls: Dict[str, str] = {}
+        self.buckets: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _band_keys(signature: List[int]) -> List[str]:
+        return [
+            f"{band}:"
+            + ",".join(
+                str(value)
+                for value in signature[
+                    band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND
+                ]
+            )
+            for band in range(BANDS)
+        ]
+
+    def add(self, material_data: Dict[str, Any]) -> None:
+        """Adds a material to the index."""
+        key = _material_key(material_data)
+        signature = minhash_signature(material_data)
+
+        self.signatures[key] = signature
+        self.titles[key] = material_data.get("titulo", "")
+        self.fingerprints[key] = _material_fingerprint(material_data)
+        if material_data.get("url"):
+            self.urls[normalize_url(material_data["url"])] = key
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        """Removes a material from everything but the URL map, which callers
+        rebuild once after removing materials in bulk."""
+        signature = self.signatures.pop(key)
+        self.titles.pop(key, None)
+        self.fingerprints.pop(key, None)
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def sync(self, materials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drops indexed materials that are no longer in the catalog or were
+        edited since indexed, and returns the materials that still need to be
+        checked and added to the index."""
+        current = {_material_key(material): material for material in materials}
+
+        for key in list(self.signatures):
+            material = current.get(key)
+            if (
+                material is None
+                or _material_fingerprint(material) != self.fingerprints.get(key)
+            ):
+                self._remove(key)
+
+        self.urls = {
+            url: key for url, key in self.urls.items() if key in self.signatures
+        }
+
+        return [
+            material
+            for key, material in current.items()
+            if key not in self.signatures
+        ]
+
+    def find_duplicate(self, material_data: Dict[str, Any]) -> Optional[str]:
+        """Returns the title of an indexed material that is likely a duplicate
+        of the given one, or None if there is no such material.
+
+        A material is a likely duplicate if it points to the same normalized
+        URL or if the estimated similarity of title and author is above
+        SIMILARITY_THRESHOLD. The material itself is never reported.
+        """
+        key = _material_key(material_data)
+
+        if material_data.get("url"):
+            url_key = self.urls.get(normalize_url(material_data["url"]))
+            if url_key is not None and url_key != key:
+                return self.titles[url_key]
+
+        signature = minhash_signature(material_data)
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        candidates.discard(key)
+
+        for candidate in sorted(candidates):
+            similarity = estimate_similarity(signature, self.signatures[candidate])
+            if similarity >= SIMILARITY_THRESHOLD:
+                return self.titles[candidate]
+
+        return None
+
+    def save(self, file_path: str) -> None:
+        """Persists the index to a JSON file.
+
+        Keys are sorted so the file only changes when the indexed materials do and
+        can be committed alongside the catalog. The file is written to a temporary
+        file and then renamed, so an interrupted run never leaves it half-written."""
+        from curadoria_coletiva.collect_materials import create_temp_file
+
+        file_descriptor, temp_file = create_temp_file(file_path)
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "num_permutations": NUM_PERMUTATIONS,
+                        "bands": BANDS,
+                        "signatures": self.signatures,
+                        "titles": self.titles,
+                        "fingerprints": self.fingerprints,
+                        "urls": self.urls,
+                    },
+                    file,
+                    ensure_ascii=False,
+                    sort_keys=True,
+                )
+            os.replace(temp_file, file_path)
+        except Exception:
+            os.remove(temp_file)
+            raise
+
+    @classmethod
+    def load(cls, file_path: str) -> "NearDuplicateIndex":
+        """Loads an index persisted with `save`. Returns an empty index if the
+        file does not exist or was built with different parameters."""
+        index = cls()
+        if not os.path.exists(file_path):
+            return index
+
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+        if (
+            data.get("num_permutations") != NUM_PERMUTATIONS
+            or data.get("bands") != BANDS
+        ):
+            return index
+
+        index.signatures = data["signatures"]
+        index.titles = data["titles"]
+        index.fingerprints = data["fingerprints"]
+        index.urls = data["urls"]
+        for key, signature in index.signatures.items():
+            for band_key in cls._band_keys(signature):
+                index.buckets.setdefault(band_key, set()).add(key)
+
+        return index
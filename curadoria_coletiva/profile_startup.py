@@ -0,0 +1,78 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+DEFAULT_BUDGET_SECONDS = 3.0
+TOP_IMPORTS = 40
+
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| \s*(\S+)")
+
+
+def profile_startup(
+    module: str, report_file: str, budget_seconds: float = DEFAULT_BUDGET_SECONDS
+) -> float:
+    """Imports a module in a fresh interpreter, as a cold start would, and reports
+    how long it took and which imports were the slowest.
+
+    The interpreter runs with `-X importtime`; the slowest imports by cumulative time
+    are written to `report_file`, followed by the raw `-X importtime` output.
+
+    Args:
+        module (str): The module to import, e.g. the one gunicorn loads.
+        report_file (str): Where to write the report.
+        budget_seconds (float): Maximum acceptable cold start time.
+
+    Returns:
+        float: The cold start time in seconds.
+
+    Raises:
+        RuntimeError: If the module fails to import.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Error importing {module}:\n{result.stderr}")
+
+    imports = _parse_import_times(result.stderr)
+    slowest = sorted(imports, key=lambda entry: entry[1], reverse=True)[:TOP_IMPORTS]
+
+    with open(report_file, "w", encoding="utf-8") as file:
+        file.write(
+            f"Cold start of {module}: {elapsed:.3f}s (budget: {budget_seconds:.3f}s)\n\n"
+        )
+        file.write(f"Slowest {len(slowest)} imports by cumulative time:\n")
+        for name, cumulative, own in slowest:
+            file.write(f"{cumulative / 1000:10.1f} ms {own / 1000:10.1f} ms  {name}\n")
+        file.write("\nRaw -X importtime output:\n")
+        file.write(result.stderr)
+
+    print(f"Cold start of {module}: {elapsed:.3f}s. Report saved to {report_file}")
+    return elapsed
+
+
+def _parse_import_times(output: str) -> List[Tuple[str, int, int]]:
+    """Returns (module, cumulative microseconds, own microseconds) of each import."""
+    imports = []
+    for line in output.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            own, cumulative, name = match.groups()
+            imports.append((name, int(cumulative), int(own)))
+    return imports
+
+
+if __name__ == "__main__":
+    budget = float(os.environ.get("STARTUP_BUDGET_SECONDS", DEFAULT_BUDGET_SECONDS))
+    elapsed = profile_startup("curadoria_coletiva.app", "startup_profile.txt", budget)
+    if elapsed > budget:
+        print(f"Cold start took {elapsed:.3f}s, over the budget of {budget:.3f}s")
+        sys.exit(1)
@@ -0,0 +1,401 @@
+import hashlib
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+TOP_K = 5
+
+ENUM_FIELDS = ["assuntos", "formato", "idioma", "nivel_dificuldade", "estilo_aprendizagem"]
+
+# Relative weight of each feature block in the similarity score.
+ENUM_WEIGHT = 1.0
+TITLE_WEIGHT = 1.0
+RECOMMENDERS_WEIGHT = 0.5
+
+# Upper bound of similarity scores held in memory at once while building.
+_MAX_BLOCK_ENTRIES = 8_000_000
+
+# New materials are added to a saved matrix instead of rebuilding it while they are
+# at most this fraction of the materials it was built with, as `add` does not update
+# the vocabularies and IDF weights.
+MAX_ADDED_FRACTION = 0.1
+
+# Version of the file format written by `SimilarMaterials.save`.
+_STATE_FORMAT = 1
+
+_STOPWORDS = {
+    "a", "ao", "as", "com", "da", "das", "de", "do", "dos", "e", "em", "na", "no",
+    "o", "os", "para", "por", "um", "uma", "an", "and", "for", "in", "of", "the",
+    "to", "with",
+}
+
+
+class SimilarMaterials:
+    """
+    Top-k most similar materials of every material, precomputed from a sparse
+    feature matrix.
+
+    Each material is represented by three L2-normalized feature blocks: one-hot
+    enum values (`ENUM_FIELDS`), TF-IDF of the title terms and the users that
+    recommend it. The similarity of two materials is the weighted sum of the
+    cosine similarities of each block.
+
+    Attributes:
+        titles (list of str): Title of each material, the position being its index.
+        fingerprints (list of str): Hash of the features of each material.
+        neighbors (np.ndarray): Indexes of the `top_k` most similar materials of
+        each material, most similar first, padded with -1.
+        scores (np.ndarray): Similarity score of each neighbor.
+    """
+
+    def __init__(self, materials: List[Dict[str, Any]], top_k: int = TOP_K) -> None:
+        self.top_k = top_k
+        self.titles = [material["titulo"] for material in materials]
+        self.fingerprints = [material_fingerprint(material) for material in materials]
+        self._title_index = {title: i for i, title in enumerate(self.titles)}
+
+        self._enum_vocabulary = _vocabulary(_enum_terms(m) for m in materials)
+        self._title_vocabulary = _vocabulary(_title_terms(m) for m in materials)
+        self._recommenders_vocabulary = _vocabulary(
+            _recommenders(m) for m in materials
+        )
+
+        document_frequency = np.zeros(len(self._title_vocabulary))
+        for material in materials:
+            for term in set(_title_terms(material)):
+                document_frequency[self._title_vocabulary[term]] += 1
+        self._idf = np.log((1 + len(materials)) / (1 + document_frequency)) + 1
+        self._idf_materials = len(materials)
+
+        self._features = self._to_matrix(
+            [self._vectorize(material) for material in materials]
+        )
+
+        self.neighbors, self.scores = self._top_neighbors(self._features)
+
+    def similar(self, title: str) -> List[str]:
+        """Returns the titles of the materials most similar to the given one."""
+        index = self._title_index.get(title)
+        if index is None:
+            return []
+        return [self.titles[i] for i in self.neighbors[index] if i >= 0]
+
+    def add(self, material: Dict[str, Any]) -> int:
+        """Adds a material without recomputing the neighbors of the whole catalog.
+
+        Only the similarities between the new material and the existing ones are
+        computed. Vocabularies and IDF weights stay as they were at build time, so
+        terms only seen in added materials do not make materials more similar.
+
+        Returns:
+            int: The index of the added material.
+        """
+        vector = self._to_matrix([self._vectorize(material)])
+        similarities = (self._features @ vector.T).toarray().ravel()
+        new_index = len(self.titles)
+
+        for i in np.nonzero(similarities > self.scores[:, -1])[0]:
+            row_neighbors = np.append(self.neighbors[i], new_index)
+            row_scores = np.append(self.scores[i], similarities[i])
+            order = np.argsort(-row_scores, kind="stable")[: self.top_k]
+            self.neighbors[i], self.scores[i] = row_neighbors[order], row_scores[order]
+
+        neighbors, scores = _top_k(similarities[np.newaxis, :], self.top_k)
+        self.neighbors = np.vstack([self.neighbors, neighbors])
+        self.scores = np.vstack([self.scores, scores])
+        self._features = sparse.vstack([self._features, vector], format="csr")
+        self.titles.append(material["titulo"])
+        self.fingerprints.append(material_fingerprint(material))
+        self._title_index[material["titulo"]] = new_index
+
+        return new_index
+
+    def save(self, state_file: str) -> None:
+        """Saves the matrix, neighbors and vocabularies to a `.npz` file, so they can
+        be loaded and extended with `add` later.
+
+        The file is written to a temporary file and then renamed, so concurrent
+        readers never see a half-written state."""
+        from curadoria_coletiva.collect_materials import create_temp_file
+
+        metadata = {
+            "format": _STATE_FORMAT,
+            "top_k": self.top_k,
+            "titles": self.titles,
+            "fingerprints": self.fingerprints,
+            "enum_vocabulary": list(self._enum_vocabulary),
+            "title_vocabulary": list(self._title_vocabulary),
+            "recommenders_vocabulary": list(self._recommenders_vocabulary),
+            "idf_materials": self._idf_materials,
+        }
+        file_descriptor, temp_file = create_temp_file(state_file)
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.savez(
+                    file,
+                    metadata=np.array(json.dumps(metadata, ensure_ascii=False)),
+                    idf=self._idf,
+                    neighbors=self.neighbors,
+                    scores=self.scores,
+                    data=self._features.data,
+                    indices=self._features.indices,
+                    indptr=self._features.indptr,
+                    shape=np.array(self._features.shape),
+                )
+            os.replace(temp_file, state_file)
+        except Exception:
+            os.remove(temp_file)
+            raise
+
+    @classmethod
+    def load(cls, state_file: str) -> "SimilarMaterials":
+        """Loads similar materials saved by `save`.
+
+        Raises:
+            ValueError: If the file is not a state saved in the current format.
+        """
+        with np.load(state_file, allow_pickle=False) as state:
+            metadata = json.loads(state["metadata"].item())
+            if metadata.get("format") != _STATE_FORMAT:
+                raise ValueError(f"Unsupported similar materials file: {state_file}")
+
+            similar_materials = cls.__new__(cls)
+            similar_materials.top_k = metadata["top_k"]
+            similar_materials.titles = metadata["titles"]
+            similar_materials.fingerprints = metadata["fingerprints"]
+            similar_materials._title_index = {
+                title: i for i, title in enumerate(similar_materials.titles)
+            }
+            similar_materials._enum_vocabulary = _vocabulary(
+                [metadata["enum_vocabulary"]]
+            )
+            similar_materials._title_vocabulary = _vocabulary(
+                [metadata["title_vocabulary"]]
+            )
+            similar_materials._recommenders_vocabulary = _vocabulary(
+                [metadata["recommenders_vocabulary"]]
+            )
+            similar_materials._idf = state["idf"]
+            similar_materials._idf_materials = metadata["idf_materials"]
+            similar_materials.neighbors = state["neighbors"]
+            similar_materials.scores = state["scores"]
+            similar_materials._features = sparse.csr_matrix(
+                (state["data"], state["indices"], state["indptr"]),
+                shape=tuple(state["shape"]),
+            )
+        return similar_materials
+
+    def memory_size(self) -> int:
+        """Returns the memory used by the feature matrix and neighbors, in bytes."""
+        return (
+            self.neighbors.nbytes
+            + self.scores.nbytes
+            + self._features.data.nbytes
+            + self._features.indices.nbytes
+            + self._features.indptr.nbytes
+        )
+
+    def _num_features(self) -> int:
+        return (
+            len(self._enum_vocabulary)
+            + len(self._title_vocabulary)
+            + len(self._recommenders_vocabulary)
+        )
+
+    def _vectorize(self, material: Dict[str, Any]) -> Tuple[List[int], List[float]]:
+        """Returns the columns and values of the weighted, block-normalized feature
+        row of a material."""
+        blocks = [
+            (
+                self._enum_vocabulary,
+                {term: 1.0 for term in _enum_terms(material)},
+                ENUM_WEIGHT,
+            ),
+            (
+                self._title_vocabulary,
+                {
+                    term: count * self._term_idf(term)
+                    for term, count in Counter(_title_terms(material)).items()
+                },
+                TITLE_WEIGHT,
+            ),
+            (
+                self._recommenders_vocabulary,
+                {user: 1.0 for user in _recommenders(material)},
+                RECOMMENDERS_WEIGHT,
+            ),
+        ]
+
+        columns, values = [], []
+        offset = 0
+        for vocabulary, term_weights, block_weight in blocks:
+            # Terms missing from the vocabulary (materials added after the build)
+            # still count towards the norm of their block.
+            norm = math.sqrt(sum(weight**2 for weight in term_weights.values()))
+            for term, weight in term_weights.items():
+                if term in vocabulary:
+                    columns.append(offset + vocabulary[term])
+                    values.append(weight / norm * math.sqrt(block_weight))
+            offset += len(vocabulary)
+
+        return columns, values
+
+    def _to_matrix(self, rows: List[Tuple[List[int], List[float]]]) -> sparse.csr_matrix:
+        """Stacks feature rows built by `_vectorize` into a sparse matrix."""
+        indptr = np.cumsum([0] + [len(columns) for columns, _ in rows])
+        indices = [column for columns, _ in rows for column in columns]
+        data = [value for _, values in rows for value in values]
+        return sparse.csr_matrix(
+            (
+                np.array(data, dtype=np.float32),
+                np.array(indices, dtype=np.int64),
+                indptr,
+            ),
+            shape=(len(rows), self._num_features()),
+        )
+
+    def _term_idf(self, term: str) -> float:
+        if term in self._title_vocabulary:
+            return self._idf[self._title_vocabulary[term]]
+        return math.log(1 + self._idf_materials) + 1
+
+    def _top_neighbors(
+        self, features: sparse.csr_matrix
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Computes the top-k neighbors of every row, a block of rows at a time."""
+        num_materials = features.shape[0]
+        neighbors = np.full((num_materials, self.top_k), -1, dtype=np.int64)
+        scores = np.zeros((num_materials, self.top_k), dtype=np.float32)
+        block_size = max(
+            1, _MAX_BLOCK_ENTRIES // max(1, num_materials, features.shape[1])
+        )
+
+        for start in range(0, num_materials, block_size):
+            end = min(start + block_size, num_materials)
+            # Sparse times dense is much faster than sparse times sparse here, as
+            # shared enum values make most similarities non-zero anyway.
+            similarities = (features @ features[start:end].T.toarray()).T
+            similarities[np.arange(end - start), np.arange(start, end)] = 0
+            neighbors[start:end], scores[start:end] = _top_k(similarities, self.top_k)
+
+        return neighbors, scores
+
+
+def build_similar_materials(
+    materials: List[Dict[str, Any]],
+    state_file: Optional[str] = None,
+    top_k: int = TOP_K,
+) -> SimilarMaterials:
+    """Returns the similar materials of a catalog, reusing the ones saved in
+    `state_file` when possible.
+
+    If the saved materials are all still in the catalog, unchanged, and the new ones
+    are few enough (see `MAX_ADDED_FRACTION`), the new ones are added to the saved
+    matrix with `SimilarMaterials.add`. Otherwise everything is rebuilt. Either way,
+    the result is saved back to `state_file` if it changed.
+    """
+    if state_file is None:
+        return SimilarMaterials(materials, top_k)
+
+    try:
+        similar_materials = SimilarMaterials.load(state_file)
+    except (OSError, ValueError, KeyError):
+        similar_materials = None
+
+    if similar_materials is not None:
+        fingerprints = {
+            material["titulo"]: material_fingerprint(material) for material in materials
+        }
+        saved_fingerprints = dict(
+            zip(similar_materials.titles, similar_materials.fingerprints)
+        )
+        added = [
+            material
+            for material in materials
+            if material["titulo"] not in saved_fingerprints
+        ]
+        reusable = (
+            similar_materials.top_k == top_k
+            and len(fingerprints) == len(materials)
+            and all(
+                fingerprints.get(title) == fingerprint
+                for title, fingerprint in saved_fingerprints.items()
+            )
+            and len(added) <= MAX_ADDED_FRACTION * len(saved_fingerprints)
+        )
+        if reusable:
+            if not added:
+                return similar_materials
+            for material in added:
+                similar_materials.add(material)
+            similar_materials.save(state_file)
+            return similar_materials
+
+    similar_materials = SimilarMaterials(materials, top_k)
+    similar_materials.save(state_file)
+    return similar_materials
+
+
+def material_fingerprint(material: Dict[str, Any]) -> str:
+    """Returns a hash of the features of a material used for its similarity."""
+    features = [material.get("titulo"), _enum_terms(material), _recommenders(material)]
+    content = json.dumps(features, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def _top_k(similarities: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the indexes and scores of the k highest positive scores of each row,
+    highest first, padded with -1 and 0."""
+    rows, columns = similarities.shape
+    neighbors = np.full((rows, k), -1, dtype=np.int64)
+    scores = np.zeros((rows, k), dtype=np.float32)
+    if not columns:
+        return neighbors, scores
+
+    kept = min(k, columns)
+    candidates = np.argpartition(-similarities, kept - 1, axis=1)[:, :kept]
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+    positive = candidate_scores > 0
+    neighbors[:, :kept] = np.where(positive, candidates, -1)
+    scores[:, :kept] = np.where(positive, candidate_scores, 0)
+    return neighbors, scores
+
+
+def _vocabulary(term_lists) -> Dict[str, int]:
+    vocabulary: Dict[str, int] = {}
+    for terms in term_lists:
+        for term in terms:
+            vocabulary.setdefault(term, len(vocabulary))
+    return vocabulary
+
+
+def _enum_terms(material: Dict[str, Any]) -> List[str]:
+    terms = []
+    for field in ENUM_FIELDS:
+        values = material.get(field)
+        if isinstance(values, (list, set, tuple)):
+            terms.extend(f"{field}={value}" for value in values)
+        elif values is not None:
+            terms.append(f"{field}={values}")
+    return terms
+
+
+def _title_terms(material: Dict[str, Any]) -> List[str]:
+    text = unicodedata.normalize("NFKD", material.get("titulo") or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [term for term in re.findall(r"\w+", text.lower()) if term not in _STOPWORDS]
+
+
+def _recommenders(material: Dict[str, Any]) -> List[str]:
+    return list(material.get("recomendado_por") or [])
@@ -1,22 +1,49 @@
+import os
 import sys
 import yaml
 from pydantic import ValidationError
-from typing import Set, List, Dict, Any
+from typing import Set, List, Dict, Any, Optional
 from curadoria_coletiva.material_model import Material
 from curadoria_coletiva.collect_materials import collect_materials
+from curadoria_coletiva.near_duplicates import NearDuplicateIndex
 
 
-def validate_materials_from_yaml(yaml_file: str) -> List[Dict[str, Any]]:
-    """Reads materials from a YAML file, validates each material, and returns them as a list."""
+def validate_materials_from_yaml(
+    yaml_file: str, index_file: Optional[str] = None, update_index: bool = False
+) -> List[Dict[str, Any]]:
+    """Reads materials from a YAML file, validates each material, and returns them as a list.
+
+    If `index_file` is given, the near-duplicate index persisted there is reused, so only
+    materials that are new or were edited since it was saved are checked for near
+    duplicates. The index is only saved back to it if `update_index` is True: the
+    committed index is updated on purpose by maintainers, never as a side effect of
+    validating, and a stale index only makes validation check more materials.
+
+    Likely near duplicates are only reported as warnings, since materials of a series
+    (e.g. volumes 1 and 2 of a book) legitimately have almost the same title."""
 
     unique_titles: Set[str] = set()
     validated_materials: List[Dict[str, Any]] = []
 
     materials_data = _load_yaml_file(yaml_file)
 
+    duplicate_index = (
+        NearDuplicateIndex.load(index_file) if index_file else NearDuplicateIndex()
+    )
+    materials_to_check = {
+        id(material_data) for material_data in duplicate_index.sync(materials_data)
+    }
+
     for material_data in materials_data:
         try:
             _validate_material(material_data, unique_titles)
+            if id(material_data) in materials_to_check:
+                duplicate_title = _find_near_duplicate(material_data, duplicate_index)
+                if duplicate_title is not None:
+                    print(
+                        f"Warning: material {material_data.get('titulo')} is likely a "
+                        f"duplicate of material: {duplicate_title}"
+                    )
             validated_materials.append(material_data)
             print(f"Valid material found: {material_data.get('titulo')}")
         except ValidationError as e:
@@ -26,6 +53,15 @@ def validate_materials_from_yaml(yaml_file: str) -> List[Dict[str, Any]]:
             print(f"Value error in material {material_data.get('titulo')}: {e}")
             sys.exit(1)
 
+    if index_file and update_index:
+        duplicate_index.save(index_file)
+        print(f"Near-duplicate index saved to {index_file}")
+    elif index_file and materials_to_check:
+        print(
+            f"{len(materials_to_check)} material(s) new or edited since {index_file} "
+            "was saved. Run with UPDATE_DUPLICATE_INDEX=1 to update it."
+        )
+
     return validated_materials
 
 
@@ -71,7 +107,33 @@ def _validate_material(material_data: Dict[str, Any], unique_titles: Set[str]) -
         raise e  # Re-raise the ValidationError for the caller to handle
 
 
+def _find_near_duplicate(
+    material_data: Dict[str, Any], duplicate_index: NearDuplicateIndex
+) -> Optional[str]:
+    """Checks the material against the near-duplicate index and adds it to the index.
+
+    A material is a near duplicate of an indexed one if both point to the same URL once
+    normalized (tracking parameters, 'www.', trailing slashes, etc. removed) or if their
+    titles and authors are almost the same.
+
+    Args:
+        material_data (Dict[str, Any]): The data for the material to validate.
+        duplicate_index (NearDuplicateIndex): The index of materials already validated.
+
+    Returns:
+        Optional[str]: The title of the material it likely duplicates, if any.
+
+    Raises:
+        ValueError: If the URL of the material is invalid.
+    """
+    duplicate_title = duplicate_index.find_duplicate(material_data)
+    duplicate_index.add(material_data)
+    return duplicate_title
+
+
 if __name__ == "__main__":
     input_yaml_file = "curadoria_coletiva/all_materials.yml"
+    signatures_file = "curadoria_coletiva/all_materials_signatures.json"
+    update_index = os.environ.get("UPDATE_DUPLICATE_INDEX") == "1"
     collect_materials("curadoria_coletiva/materials", input_yaml_file)
-    validate_materials_from_yaml(input_yaml_file)
+    validate_materials_from_yaml(input_yaml_file, signatures_file, update_index)
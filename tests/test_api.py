@@ -0,0 +1,194 @@
+import json
+
+import flask
+import pytest
+import yaml
+
+from curadoria_coletiva.api import register_api_routes
+from curadoria_coletiva.collection_registry import Collection, CollectionRegistry
+
+MATERIALS = [
+    {
+        "titulo": "Python para iniciantes",
+        "autoria": "Ana",
+        "url": "https://example.com/python",
+        "assuntos": ["python"],
+        "formato": "vídeo",
+        "minutos_necessarios": 60,
+        "nivel_dificuldade": "iniciante",
+        "eh_gratuito": True,
+        "recomendado_por": ["ana"],
+    },
+    {
+        # No `autoria` nor `prerequisitos`: they must come out as null and [].
+        "titulo": "Pandas na prática",
+        "url": "https://example.com/pandas",
+        "assuntos": ["python", "ciência de dados"],
+        "formato": "livro",
+        "minutos_necessarios": 300,
+        "nivel_dificuldade": "intermediário",
+        "eh_gratuito": False,
+        "recomendado_por": ["bia"],
+    },
+    {
+        "titulo": "HTML básico",
+        "autoria": "Caio",
+        "url": "https://example.com/html",
+        "assuntos": ["html"],
+        "formato": "vídeo",
+        "minutos_necessarios": 30,
+        "prerequisitos": [],
+        "nivel_dificuldade": "iniciante",
+        "eh_gratuito": True,
+        "recomendado_por": ["caio"],
+        "comentarios": [{"usuario": "ana", "texto": "Ótimo"}],
+    },
+]
+
+
+def _reject_constant(constant):
+    raise ValueError(f"Invalid JSON constant: {constant}")
+
+
+@pytest.fixture(params=["pandas", "sqlite"])
+def registry(request, tmp_path):
+    materials_path = tmp_path / "materials"
+    materials_path.mkdir()
+    (materials_path / "materials.yml").write_text(
+        yaml.dump(MATERIALS, allow_unicode=True), encoding="utf-8"
+    )
+    registry = CollectionRegistry(10 * 1024 * 1024, request.param)
+    registry.register(Collection("teste", str(materials_path), str(tmp_path)))
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    server = flask.Flask(__name__)
+    register_api_routes(server, registry, "teste")
+    return server.test_client()
+
+
+def test_filters_sorts_and_projects_fields(client):
+    response = client.get(
+        "/api/materials?assunto=python&ordenar=minutos_necessarios"
+        "&fields=titulo,autoria,prerequisitos"
+    )
+
+    assert response.status_code == 200
+    assert json.loads(response.data, parse_constant=_reject_constant) == {
+        "total": 2,
+        "items": [
+            {"titulo": "Python para iniciantes", "autoria": "Ana", "prerequisitos": []},
+            {"titulo": "Pandas na prática", "autoria": None, "prerequisitos": []},
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_collection_routes(client):
+    response = client.get("/api/colecoes/teste/materials?formato=vídeo&fields=titulo")
+    assert [item["titulo"] for item in response.json["items"]] == [
+        "Python para iniciantes",
+        "HTML básico",
+    ]
+
+    response = client.get("/api/colecoes/outra/materials")
+    assert response.status_code == 404
+
+
+def test_cursor_pagination(client):
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get(f"/api/materials?limit=2&fields=titulo&cursor={cursor}").json
+        titles.extend(item["titulo"] for item in page["items"])
+        cursor = page["next_cursor"]
+
+    assert titles == [material["titulo"] for material in MATERIALS]
+
+
+def test_cursor_from_another_catalog_version_is_refused(client, registry):
+    cursor = client.get("/api/materials?limit=1").json["next_cursor"]
+    registry.get("teste").version = "outra versão"
+
+    response = client.get(f"/api/materials?limit=1&cursor={cursor}")
+
+    assert response.status_code == 400
+
+
+def test_not_modified_without_searching(client, registry, monkeypatch):
+    response = client.get("/api/materials?gratuito=sim")
+    assert response.status_code == 200
+
+    def search(*args, **kwargs):
+        raise AssertionError("The catalog should not be searched")
+
+    monkeypatch.setattr(registry.get("teste"), "search", search)
+    response = client.get(
+        "/api/materials?gratuito=sim", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "ordenar=comentarios",
+        "fields=titulo,senha",
+        "limit=0",
+        "limit=muitos",
+        "cursor=invalido",
+        "page=0",
+    ],
+)
+def test_bad_requests(client, query):
+    response = client.get(f"/api/materials?{query}")
+
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_ndjson_export(client):
+    response = client.get("/api/materials.ndjson?q=python")
+
+    assert response.mimetype == "application/x-ndjson"
+    materials = [
+        json.loads(line, parse_constant=_reject_constant)
+        for line in response.get_data(as_text=True).splitlines()
+    ]
+    assert [material["titulo"] for material in materials] == [
+        "Python para iniciantes",
+        "Pandas na prática",
+    ]
+    assert materials[1]["autoria"] is None
+    assert materials[1]["comentarios"] == []
+
+
+def test_routes_each_collection_to_its_catalog(tmp_path):
+    registry = CollectionRegistry(10 * 1024 * 1024)
+    for name, materials in [("teste", MATERIALS[:2]), ("outra", MATERIALS[2:])]:
+        materials_path = tmp_path / name / "materials"
+        materials_path.mkdir(parents=True)
+        (materials_path / "materials.yml").write_text(
+            yaml.dump(materials, allow_unicode=True), encoding="utf-8"
+        )
+        registry.register(Collection(name, str(materials_path), str(tmp_path / name)))
+    server = flask.Flask(__name__)
+    register_api_routes(server, registry, "teste")
+    client = server.test_client()
+
+    def titles(url):
+        return [item["titulo"] for item in client.get(url).json["items"]]
+
+    assert titles("/api/materials?fields=titulo") == [
+        "Python para iniciantes",
+        "Pandas na prática",
+    ]
+    assert titles("/api/colecoes/teste/materials?fields=titulo") == titles(
+        "/api/materials?fields=titulo"
+    )
+    assert titles("/api/colecoes/outra/materials?fields=titulo") == ["HTML básico"]
+    response = client.get("/api/colecoes/outra/materials.ndjson?fields=titulo")
+    assert response.data.decode("utf-8") == '{"titulo": "HTML básico"}\n'
+    assert client.get("/api/colecoes/nenhuma/materials").status_code == 404
@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+
+import yaml
+
+import curadoria_coletiva.app as app
+from curadoria_coletiva.collection_registry import Collection, CollectionRegistry
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _material(number):
+    return {
+        "titulo": f"Material {number:02d}",
+        "autoria": "Ana",
+        "url": f"https://example.com/{number}",
+        "assuntos": ["python"],
+        "formato": "vídeo",
+        "minutos_necessarios": 10 + number,
+        "ritmo": "médio",
+        "estilo_aprendizagem": "visual",
+        "idioma": "português (BR)",
+        "nivel_dificuldade": "iniciante",
+        "eh_gratuito": True,
+        "recomendado_por": ["ana"],
+    }
+
+
+def test_layout_has_the_first_page_of_results(tmp_path):
+    materials_path = tmp_path / "materials"
+    materials_path.mkdir()
+    # Neither `prerequisitos` nor `comentarios` are given: both default to empty.
+    materials = [_material(number) for number in range(app.RESULTS_PAGE_SIZE + 5)]
+    (materials_path / "materials.yml").write_text(
+        yaml.dump(materials, allow_unicode=True), encoding="utf-8"
+    )
+    registry = CollectionRegistry(10 * 1024 * 1024)
+    registry.register(Collection("teste", str(materials_path), str(tmp_path)))
+
+    layout = app._create_layout(registry.get("teste"))
+
+    assert layout["results-section-title"].children == "Resultados (25)"
+    assert len(layout["results"].children) == app.RESULTS_PAGE_SIZE
+    assert layout["show-more-button"].style["display"] == "block"
+
+
+def test_serves_each_collection_under_its_own_path(tmp_path):
+    # The app finds the collections when imported, relative to the working directory,
+    # so it runs in a fresh interpreter in a directory with its own collections.
+    for materials_path, title in [
+        (tmp_path / "curadoria_coletiva" / "materials", "Material 01"),
+        (tmp_path / "curadoria_coletiva" / "colecoes" / "extra" / "materials", None),
+    ]:
+        materials_path.mkdir(parents=True)
+        material = _material(1) if title else {**_material(2), "titulo": "Extra"}
+        (materials_path / "materials.yml").write_text(
+            yaml.dump([material], allow_unicode=True), encoding="utf-8"
+        )
+    script = """
+import json, sys
+import curadoria_coletiva.app as app
+
+client = app.server.test_client()
+default_layout = client.get("/_dash-layout")
+extra_loaded_before = "extra" in app.registry._catalogs
+extra_layout = client.get("/colecoes/extra/_dash-layout")
+extra_api = client.get("/api/colecoes/extra/materials?fields=titulo")
+print(json.dumps({
+    "default": [default_layout.status_code, "Material 01" in default_layout.text],
+    "extra_loaded_before": extra_loaded_before,
+    "extra": [
+        extra_layout.status_code,
+        "Extra" in extra_layout.text,
+        "Material 01" in extra_layout.text,
+    ],
+    "extra_api": extra_api.json["items"],
+}))
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": REPO_DIR},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert json.loads(result.stdout.splitlines()[-1]) == {
+        "default": [200, True],
+        "extra_loaded_before": False,
+        "extra": [200, True, False],
+        "extra_api": [{"titulo": "Extra"}],
+    }
@@ -0,0 +1,153 @@
+import pytest
+import yaml
+
+from curadoria_coletiva.catalog_store import CatalogStore, write_catalog_db
+from curadoria_coletiva.collection_registry import Collection, CollectionRegistry
+
+MATERIALS = [
+    {
+        "titulo": "Introdução ao Python (2ª edição)",
+        "autoria": "Ana",
+        "url": "https://example.com/python",
+        "assuntos": ["python", "programação básica"],
+        "formato": "livro",
+        "minutos_necessarios": 300,
+        "ritmo": "médio",
+        "estilo_aprendizagem": "leitura",
+        "idioma": "português (BR)",
+        "nivel_dificuldade": "iniciante",
+        "eh_gratuito": True,
+        "recomendado_por": ["ana"],
+        "comentarios": [{"usuario": "bia", "texto": "Ótimo para começar"}],
+    },
+    {
+        "titulo": "C++ avançado",
+        "autoria": "Caio",
+        "url": "https://example.com/cpp",
+        "assuntos": ["c++"],
+        "formato": "vídeo",
+        "minutos_necessarios": 120,
+        "prerequisitos": ["programação básica"],
+        "ritmo": "rápido",
+        "estilo_aprendizagem": "visual",
+        "idioma": "inglês",
+        "nivel_dificuldade": "avançado",
+        "eh_gratuito": False,
+        "recomendado_por": ["caio"],
+    },
+    {
+        # Without `estilo_aprendizagem`, which must not show up as a distinct value.
+        "titulo": "Python para ciência de dados",
+        "autoria": "Bia",
+        "url": "https://example.com/dados",
+        "assuntos": ["python", "ciência de dados"],
+        "formato": "vídeo",
+        "minutos_necessarios": 90,
+        "prerequisitos": ["python"],
+        "ritmo": "médio",
+        "idioma": "português (BR)",
+        "nivel_dificuldade": "intermediário",
+        "eh_gratuito": True,
+        "recomendado_por": ["ana", "bia"],
+    },
+]
+
+
+@pytest.fixture
+def catalogs(tmp_path):
+    """The same collection loaded with each engine."""
+    materials_path = tmp_path / "materials"
+    materials_path.mkdir()
+    (materials_path / "materials.yml").write_text(
+        yaml.dump(MATERIALS, allow_unicode=True), encoding="utf-8"
+    )
+
+    catalogs = {}
+    for engine in ["pandas", "sqlite"]:
+        output_dir = tmp_path / engine
+        output_dir.mkdir()
+        registry = CollectionRegistry(10 * 1024 * 1024, engine)
+        registry.register(Collection("teste", str(materials_path), str(output_dir)))
+        catalogs[engine] = registry.get("teste")
+    return catalogs
+
+
+def _titles(catalog, **filters):
+    return list(catalog.search(**filters)["titulo"])
+
+
+@pytest.mark.parametrize(
+    "search_term",
+    ["ção", "avanc", "AVANÇ", "c++", "(2ª", "ótimo", "py", "a", "True", "ana", "xyz"],
+)
+def test_engines_match_the_search_term_alike(catalogs, search_term):
+    assert _titles(catalogs["sqlite"], search_term=search_term) == _titles(
+        catalogs["pandas"], search_term=search_term
+    )
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"selected_subject": ["python"]},
+        {"selected_subject": ["python", "ciência de dados"]},
+        {"selected_format": ["vídeo"], "free_filter": ["gratuito"]},
+        {"selected_language": ["português (BR)"], "sort_column": "minutos_necessarios"},
+        {"search_term": "python", "sort_column": "titulo"},
+    ],
+)
+def test_engines_filter_and_sort_alike(catalogs, filters):
+    assert _titles(catalogs["sqlite"], **filters) == _titles(catalogs["pandas"], **filters)
+
+
+def test_engines_agree_on_distinct_values(catalogs):
+    for field in ["assuntos", "formato", "estilo_aprendizagem", "nivel_dificuldade"]:
+        assert catalogs["sqlite"].distinct_values(field) == catalogs[
+            "pandas"
+        ].distinct_values(field)
+    assert catalogs["sqlite"].distinct_values("estilo_aprendizagem") == [
+        "leitura",
+        "visual",
+    ]
+
+
+def test_engines_agree_on_paths_and_similar_materials(catalogs):
+    sqlite, pandas = catalogs["sqlite"], catalogs["pandas"]
+
+    assert sqlite.covered_subjects == pandas.covered_subjects
+    for subject in pandas.covered_subjects:
+        for level in ["iniciante", "avançado"]:
+            assert sqlite.learning_path(subject, level) == pandas.learning_path(
+                subject, level
+            )
+    assert sqlite.learning_path("ciência de dados", "avançado", max_minutes=90)[
+        "minutos"
+    ] == 90
+    assert sqlite.learning_path("ciência de dados", "avançado", max_minutes=89) is None
+    for material in MATERIALS:
+        assert sqlite.similar(material["titulo"]) == pandas.similar(material["titulo"])
+    assert sqlite.similar("Python para ciência de dados")[0] == {
+        "titulo": "Introdução ao Python (2ª edição)",
+        "url": "https://example.com/python",
+    }
+
+
+def test_sqlite_catalog_keeps_nothing_per_material(catalogs):
+    sqlite = catalogs["sqlite"]
+
+    assert sqlite.df is None
+    assert sqlite.learning_paths is None
+    assert sqlite.similar_materials is None
+
+
+def test_catalog_is_not_rewritten_at_the_same_version(tmp_path, capsys):
+    db_file = str(tmp_path / "all_materials.db")
+
+    write_catalog_db(MATERIALS, db_file, "v1")
+    write_catalog_db(MATERIALS, db_file, "v1")
+    assert "up to date" in capsys.readouterr().out
+
+    write_catalog_db(MATERIALS[:1], db_file, "v2")
+    assert [material["titulo"] for material in CatalogStore(db_file).search()] == [
+        MATERIALS[0]["titulo"]
+    ]
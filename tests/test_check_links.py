@@ -0,0 +1,143 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import yaml
+
+from curadoria_coletiva.check_links import check_links
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers like the sites of the materials would: a page with an ETag, a page
+    that fails once before working, a page that never stops failing, slow pages and a
+    missing page."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+
+        if self.path == "/ok":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._respond(304)
+            else:
+                self._respond(200, {"ETag": '"v1"'})
+        elif self.path == "/flaky":
+            self.server.flaky_attempts += 1
+            self._respond(503 if self.server.flaky_attempts == 1 else 200)
+        elif self.path == "/down":
+            self._respond(503)
+        elif self.path.startswith("/slow/"):
+            with self.server.lock:
+                self.server.in_flight += 1
+                self.server.max_in_flight = max(
+                    self.server.max_in_flight, self.server.in_flight
+                )
+            time.sleep(0.5)
+            with self.server.lock:
+                self.server.in_flight -= 1
+            self._respond(200)
+        else:
+            self._respond(404)
+
+    def _respond(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests = []
+    server.flaky_attempts = 0
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _write_materials(yaml_file, urls):
+    materials = [{"titulo": url, "url": url} for url in urls]
+    yaml_file.write_text(yaml.dump(materials), encoding="utf-8")
+
+
+def test_check_links_against_stub_server(stub_server, tmp_path):
+    base_url = f"http://127.0.0.1:{stub_server.server_port}"
+    refused_url = f"http://127.0.0.1:{_unused_port()}/"
+    yaml_file = tmp_path / "all_materials.yml"
+    cache_file = tmp_path / "link_status.json"
+    _write_materials(
+        yaml_file,
+        [f"{base_url}/ok", f"{base_url}/flaky", f"{base_url}/down", f"{base_url}/missing"]
+        + [refused_url],
+    )
+
+    link_status = check_links(str(yaml_file), str(cache_file), retries=1)
+
+    assert link_status[f"{base_url}/ok"]["ok"]
+    assert link_status[f"{base_url}/ok"]["etag"] == '"v1"'
+    assert link_status[f"{base_url}/flaky"]["ok"]
+    assert link_status[f"{base_url}/flaky"]["status"] == 200
+    assert not link_status[f"{base_url}/down"]["ok"]
+    assert link_status[f"{base_url}/down"]["status"] == 503
+    assert link_status[f"{base_url}/down"]["error"] is None
+    assert not link_status[f"{base_url}/missing"]["ok"]
+    assert link_status[f"{base_url}/missing"]["status"] == 404
+    assert not link_status[refused_url]["ok"]
+    assert link_status[refused_url]["status"] is None
+    assert link_status[refused_url]["error"]
+    assert json.loads(cache_file.read_text(encoding="utf-8")) == link_status
+
+
+def test_check_links_only_rechecks_stale_links(stub_server, tmp_path):
+    url = f"http://127.0.0.1:{stub_server.server_port}/ok"
+    yaml_file = tmp_path / "all_materials.yml"
+    cache_file = tmp_path / "link_status.json"
+    _write_materials(yaml_file, [url])
+
+    check_links(str(yaml_file), str(cache_file))
+    check_links(str(yaml_file), str(cache_file))
+    assert stub_server.requests == [("/ok", None)]
+
+    # Once stale, the link is revalidated with its ETag and the server answers 304.
+    link_status = check_links(str(yaml_file), str(cache_file), ttl_seconds=-1)
+    assert stub_server.requests == [("/ok", None), ("/ok", '"v1"')]
+    assert link_status[url]["ok"]
+    assert link_status[url]["etag"] == '"v1"'
+
+
+def test_requests_queued_for_a_host_do_not_time_out(stub_server, tmp_path):
+    # Four rounds of two requests of 0.5s take 2s: only the time after a request
+    # gets its slot counts towards its timeout.
+    base_url = f"http://127.0.0.1:{stub_server.server_port}"
+    urls = [f"{base_url}/slow/{number}" for number in range(8)]
+    yaml_file = tmp_path / "all_materials.yml"
+    _write_materials(yaml_file, urls)
+
+    link_status = check_links(
+        str(yaml_file),
+        str(tmp_path / "link_status.json"),
+        per_host_concurrency=2,
+        retries=0,
+        timeout_seconds=1,
+    )
+
+    assert all(link_status[url]["ok"] for url in urls)
+    assert stub_server.max_in_flight == 2
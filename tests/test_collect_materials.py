@@ -0,0 +1,108 @@
+import os
+import stat
+
+import yaml
+
+from curadoria_coletiva.collect_materials import (
+    catalog_version,
+    collect_materials,
+    read_catalog_version,
+)
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def _write_materials(materials_path, filename, titles):
+    materials_path.mkdir(exist_ok=True)
+    (materials_path / filename).write_text(
+        yaml.dump([{"titulo": title} for title in titles], allow_unicode=True),
+        encoding="utf-8",
+    )
+
+
+def test_catalog_files_get_the_mode_open_gives_new_files(tmp_path):
+    materials_path = tmp_path / "materials"
+    materials_path.mkdir()
+    (materials_path / "python.yml").write_text(
+        yaml.dump(
+            [
+                {
+                    "titulo": "Python",
+                    "url": "https://example.com/python",
+                    "assuntos": ["python"],
+                    "minutos_necessarios": 60,
+                    "nivel_dificuldade": "iniciante",
+                }
+            ]
+        ),
+        encoding="utf-8",
+    )
+    yaml_file = tmp_path / "all_materials.yml"
+    db_file = tmp_path / "all_materials.db"
+    reference_file = tmp_path / "reference.txt"
+    reference_file.write_text("", encoding="utf-8")
+
+    collect_materials(str(materials_path), str(yaml_file), str(db_file))
+
+    assert _mode(yaml_file) == _mode(reference_file)
+    assert _mode(db_file) == _mode(reference_file)
+
+
+def test_catalog_files_follow_the_umask_when_written(tmp_path):
+    materials_path = tmp_path / "materials"
+    _write_materials(materials_path, "a.yml", ["A"])
+    yaml_file = tmp_path / "all_materials.yml"
+
+    previous_umask = os.umask(0o077)
+    try:
+        collect_materials(str(materials_path), str(yaml_file))
+    finally:
+        os.umask(previous_umask)
+
+    assert _mode(yaml_file) == 0o600
+    assert os.listdir(tmp_path) == sorted(["materials", "all_materials.yml"])
+
+
+def test_materials_are_collected_in_file_name_order(tmp_path):
+    materials_path = tmp_path / "materials"
+    _write_materials(materials_path, "b.yml", ["B1", "B2"])
+    _write_materials(materials_path, "a.yml", ["A"])
+    yaml_file = tmp_path / "all_materials.yml"
+
+    collect_materials(str(materials_path), str(yaml_file))
+
+    with open(yaml_file, encoding="utf-8") as file:
+        materials = yaml.safe_load(file)
+    assert [material["titulo"] for material in materials] == ["A", "B1", "B2"]
+    assert [material["file_path"] for material in materials] == [
+        "materials/a.yml",
+        "materials/b.yml",
+        "materials/b.yml",
+    ]
+
+
+def test_catalog_version_is_embedded_and_unchanged_catalogs_are_not_rewritten(
+    tmp_path, capsys
+):
+    materials_path = tmp_path / "materials"
+    _write_materials(materials_path, "a.yml", ["A"])
+    yaml_file = tmp_path / "all_materials.yml"
+
+    version = collect_materials(str(materials_path), str(yaml_file))
+    with open(yaml_file, encoding="utf-8") as file:
+        materials = yaml.safe_load(file)
+    assert read_catalog_version(str(yaml_file)) == version == catalog_version(materials)
+
+    written = os.stat(yaml_file)
+    capsys.readouterr()
+    assert collect_materials(str(materials_path), str(yaml_file)) == version
+    assert "up to date" in capsys.readouterr().out
+    assert os.stat(yaml_file).st_ino == written.st_ino
+    assert os.stat(yaml_file).st_mtime_ns == written.st_mtime_ns
+
+    _write_materials(materials_path, "a.yml", ["A", "B"])
+    new_version = collect_materials(str(materials_path), str(yaml_file))
+    assert new_version != version
+    assert read_catalog_version(str(yaml_file)) == new_version
@@ -0,0 +1,221 @@
+import random
+
+import pytest
+import yaml
+
+from curadoria_coletiva import collection_registry
+from curadoria_coletiva.collection_registry import (
+    WORKER_OVERHEAD_MB,
+    CatalogTooLargeError,
+    Collection,
+    CollectionRegistry,
+    default_memory_budget_mb,
+    estimate_catalog_size,
+)
+
+
+@pytest.fixture
+def collection(tmp_path):
+    materials_path = tmp_path / "materials"
+    materials_path.mkdir()
+    material = {
+        "titulo": "Python para iniciantes",
+        "url": "https://example.com/python",
+        "assuntos": ["python"],
+        "prerequisitos": [],
+        "minutos_necessarios": 60,
+        "nivel_dificuldade": "iniciante",
+    }
+    (materials_path / "python.yml").write_text(
+        yaml.dump([material], allow_unicode=True), encoding="utf-8"
+    )
+    return Collection("teste", str(materials_path), str(tmp_path))
+
+
+def _small_collection(tmp_path, name):
+    collection_dir = tmp_path / name
+    materials_path = collection_dir / "materials"
+    materials_path.mkdir(parents=True)
+    material = {
+        "titulo": f"Material {name}",
+        "url": f"https://example.com/{name}",
+        "assuntos": [name],
+        "minutos_necessarios": 60,
+        "nivel_dificuldade": "iniciante",
+    }
+    (materials_path / "materials.yml").write_text(
+        yaml.dump([material], allow_unicode=True), encoding="utf-8"
+    )
+    return Collection(name, str(materials_path), str(collection_dir))
+
+
+@pytest.fixture
+def small_collections(tmp_path):
+    """Three collections whose catalogs need the same memory, and that memory."""
+    collections = [_small_collection(tmp_path, name) for name in "abc"]
+    registry = CollectionRegistry(10 * 1024 * 1024)
+    for collection in collections:
+        registry.register(collection)
+    sizes = {registry.get(collection.name).memory_size() for collection in collections}
+    assert len(sizes) == 1
+    return collections, sizes.pop()
+
+
+def _loaded(registry):
+    return [name for name in registry.names() if name in registry._catalogs]
+
+
+def test_refuses_a_catalog_over_the_budget_without_building_it(
+    collection, monkeypatch
+):
+    def build(*args, **kwargs):
+        raise AssertionError("The catalog should not be built")
+
+    monkeypatch.setattr(collection_registry, "Catalog", build)
+    registry = CollectionRegistry(
+        estimate_catalog_size(collection, "pandas") - 1, over_budget_action="refuse"
+    )
+    registry.register(collection)
+
+    with pytest.raises(CatalogTooLargeError, match="estimated"):
+        registry.get("teste")
+
+
+def test_loads_a_catalog_within_the_budget(collection):
+    registry = CollectionRegistry(10 * 1024 * 1024, over_budget_action="refuse")
+    registry.register(collection)
+
+    catalog = registry.get("teste")
+
+    assert catalog.covered_subjects == ["python"]
+    assert 0 < registry.loaded_memory_size() <= 10 * 1024 * 1024
+
+
+def test_similar_materials_are_built_on_first_use_and_counted(collection):
+    registry = CollectionRegistry(10 * 1024 * 1024)
+    registry.register(collection)
+    catalog = registry.get("teste")
+    size_before = registry.loaded_memory_size()
+
+    assert catalog.similar("Python para iniciantes") == []
+    registry.get("teste")
+
+    assert registry.loaded_memory_size() > size_before
+
+
+def test_unloads_the_least_recently_used_catalog(small_collections):
+    collections, catalog_size = small_collections
+    registry = CollectionRegistry(2 * catalog_size)
+    for collection in collections:
+        registry.register(collection)
+
+    catalog_b = registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    assert _loaded(registry) == ["a", "c"]
+    assert registry.loaded_memory_size() <= 2 * catalog_size
+    # An unloaded catalog is loaded again on its next request, unloading "a" now.
+    assert registry.get("b") is not catalog_b
+    assert _loaded(registry) == ["b", "c"]
+
+
+def test_never_unloads_pinned_catalogs(small_collections):
+    collections, catalog_size = small_collections
+    registry = CollectionRegistry(2 * catalog_size)
+    registry.register(collections[0], pinned=True)
+    for collection in collections[1:]:
+        registry.register(collection)
+
+    registry.get("a")
+    registry.get("b")
+    registry.get("c")
+    registry.get("b")
+
+    assert _loaded(registry) == ["a", "b"]
+
+
+def test_keeps_the_requested_catalog_over_the_budget_with_a_warning(
+    small_collections, capsys
+):
+    collections, catalog_size = small_collections
+    registry = CollectionRegistry(catalog_size - 1)
+    for collection in collections:
+        registry.register(collection)
+
+    registry.get("a")
+    registry.get("b")
+
+    assert _loaded(registry) == ["b"]
+    assert "over the memory budget" in capsys.readouterr().out
+
+
+def test_cached_values_count_towards_the_budget(small_collections):
+    collections, catalog_size = small_collections
+    registry = CollectionRegistry(2 * catalog_size + 1000)
+    for collection in collections:
+        registry.register(collection)
+    registry.get("a")
+    registry.get("b")
+
+    layout = registry.cached("b", "layout", lambda catalog: "x" * 2000)
+
+    assert registry.cached("b", "layout", lambda catalog: "") is layout
+    assert _loaded(registry) == ["b"]
+
+
+def _synthetic_materials(count):
+    generator = random.Random(1)
+    subjects = ["python", "html", "css", "ciência de dados", "git", "matemática"]
+    words = "introdução curso guia prático completo dados web projeto".split()
+    return [
+        {
+            "titulo": " ".join(generator.sample(words, 4)) + f" {number}",
+            "autoria": f"Autor {number % 30}",
+            "url": f"https://example.com/{number}",
+            "assuntos": generator.sample(subjects, 2),
+            "formato": generator.choice(["vídeo", "livro", "curso"]),
+            "minutos_necessarios": generator.randint(10, 600),
+            "prerequisitos": generator.sample(subjects, 1),
+            "ritmo": "médio",
+            "estilo_aprendizagem": "visual",
+            "idioma": "português (BR)",
+            "nivel_dificuldade": generator.choice(["iniciante", "avançado"]),
+            "eh_gratuito": bool(number % 2),
+            "recomendado_por": [f"usuario{number % 20}"],
+            "comentarios": (
+                [{"usuario": "ana", "texto": "Muito bom, recomendo."}]
+                if number % 3 == 0
+                else []
+            ),
+        }
+        for number in range(count)
+    ]
+
+
+@pytest.mark.parametrize("catalog_engine", ["pandas", "sqlite"])
+def test_estimate_bounds_the_catalog_size(tmp_path, catalog_engine):
+    materials_path = tmp_path / "materials"
+    materials_path.mkdir()
+    (materials_path / "materials.yml").write_text(
+        yaml.dump(_synthetic_materials(300), allow_unicode=True), encoding="utf-8"
+    )
+    collection = Collection("teste", str(materials_path), str(tmp_path))
+    registry = CollectionRegistry(1024 * 1024 * 1024, catalog_engine)
+    registry.register(collection)
+
+    catalog = registry.get("teste")
+    catalog.similar(catalog.search()["titulo"].iloc[0])
+    size = catalog.memory_size()
+
+    estimate = estimate_catalog_size(collection, catalog_engine)
+    assert size <= estimate
+    if catalog_engine == "pandas":
+        # Rounded up, not so much that catalogs that fit would be refused.
+        assert estimate <= 1.5 * size
+
+
+def test_default_budget_leaves_each_worker_its_overhead():
+    assert default_memory_budget_mb(1024, 1) == 1024 - WORKER_OVERHEAD_MB
+    assert default_memory_budget_mb(1024, 2) == 1024 - 2 * WORKER_OVERHEAD_MB
+    assert default_memory_budget_mb(256, 4) == 0
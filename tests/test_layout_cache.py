@@ -0,0 +1,25 @@
+import dash
+from dash import html
+
+from curadoria_coletiva.layout_cache import (
+    build_layout_file,
+    layout_file_path,
+    serve_layout_file,
+)
+
+
+def test_prebuilt_layout_is_served_with_an_etag(tmp_path):
+    layout_file = layout_file_path(str(tmp_path / "build"), "v1")
+    build_layout_file(html.Div("Curadoria Coletiva", id="page"), layout_file)
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    serve_layout_file(app, layout_file, "v1")
+    client = app.server.test_client()
+
+    response = client.get("/_dash-layout")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"v1"'
+    assert response.json["props"]["children"] == "Curadoria Coletiva"
+
+    response = client.get("/_dash-layout", headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 304
@@ -0,0 +1,125 @@
+from curadoria_coletiva.learning_paths import LearningPathGraph
+
+
+def _material(titulo, assuntos, minutos, prerequisitos=(), nivel="iniciante"):
+    return {
+        "titulo": titulo,
+        "assuntos": list(assuntos),
+        "prerequisitos": list(prerequisitos),
+        "minutos_necessarios": minutos,
+        "nivel_dificuldade": nivel,
+    }
+
+
+def _titles(path):
+    return [material["titulo"] for material in path["materiais"]]
+
+
+def test_cheapest_path_lists_prerequisites_first():
+    graph = LearningPathGraph(
+        [
+            _material("ml", ["machine learning"], 120, ["python", "estatística"]),
+            _material("python longo", ["python"], 300),
+            _material("python curto", ["python"], 60),
+            _material("estatística", ["estatística"], 90, ["matemática básica"]),
+        ]
+    )
+
+    path = graph.learning_path("machine learning", "iniciante")
+
+    assert _titles(path) == ["estatística", "python curto", "ml"]
+    assert path["minutos"] == 270
+    assert path["conhecimentos_previos"] == ["matemática básica"]
+
+
+def test_path_respects_level_and_time_limit():
+    graph = LearningPathGraph(
+        [
+            _material("python", ["python"], 60),
+            _material("django", ["django"], 200, ["python"], nivel="intermediário"),
+        ]
+    )
+
+    assert graph.learning_path("django", "iniciante") is None
+    assert _titles(graph.learning_path("django", "intermediário")) == ["python", "django"]
+    assert graph.learning_path("django", "intermediário", max_minutes=100) is None
+
+
+def test_path_through_a_cycle_is_found():
+    # x1 needs Y and y1 needs X: X is only reachable through x2, which is fine.
+    graph = LearningPathGraph(
+        [
+            _material("x1", ["X"], 10, ["Y"]),
+            _material("x2", ["X"], 1),
+            _material("y1", ["Y"], 5, ["X"]),
+        ]
+    )
+
+    assert _titles(graph.learning_path("Y", "iniciante")) == ["x2", "y1"]
+    assert _titles(graph.learning_path("X", "iniciante")) == ["x2"]
+
+
+def test_path_through_a_cycle_does_not_depend_on_subject_order():
+    graph = LearningPathGraph(
+        [
+            _material("ml-intro", ["ML"], 30, ["python"]),
+            _material("ml-basic", ["ML"], 60),
+            _material("py-for-ml", ["python"], 45, ["ML"]),
+        ]
+    )
+
+    assert _titles(graph.learning_path("ML", "iniciante")) == ["ml-basic"]
+    assert _titles(graph.learning_path("python", "iniciante")) == [
+        "ml-basic",
+        "py-for-ml",
+    ]
+
+
+def test_subjects_downstream_of_a_cycle_come_after_their_prerequisites():
+    graph = LearningPathGraph(
+        [
+            _material("c", ["c"], 10, ["a"]),
+            _material("a", ["a"], 10, ["b"]),
+            _material("a básico", ["a"], 20),
+            _material("b", ["b"], 10, ["a"]),
+        ]
+    )
+
+    assert _titles(graph.learning_path("c", "iniciante")) == ["a básico", "c"]
+
+
+def test_many_prerequisite_cycles_are_fast():
+    subjects = [f"assunto {i}" for i in range(8)]
+    materials = [
+        _material(
+            f"material {i}",
+            [subjects[i % 8], subjects[(i + 3) % 8]],
+            10 + i % 7,
+            [subjects[(i + 5) % 8]],
+        )
+        for i in range(2000)
+    ]
+    materials.append(_material("introdução", [subjects[0]], 30))
+
+    graph = LearningPathGraph(materials)
+
+    assert all(graph.learning_path(subject, "iniciante") for subject in subjects)
+
+
+def test_path_sharing_a_prerequisite_is_the_cheapest():
+    # Covering A with a2 and then X for b alone costs 161 minutes; covering X once
+    # for both a-barato and b costs 121.
+    graph = LearningPathGraph(
+        [
+            _material("t", ["T"], 1, ["A", "B"]),
+            _material("a-barato", ["A"], 10, ["X"]),
+            _material("a2", ["A"], 50),
+            _material("x", ["X"], 100),
+            _material("b", ["B"], 10, ["X"]),
+        ]
+    )
+
+    path = graph.learning_path("T", "iniciante", max_minutes=130)
+
+    assert _titles(path) == ["x", "a-barato", "b", "t"]
+    assert path["minutos"] == 121
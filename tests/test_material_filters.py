@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from curadoria_coletiva.material_filters import filter_materials
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        [
+            {
+                "titulo": "C++ moderno",
+                "minutos_necessarios": 90,
+                "comentarios": [{"usuario": "ana", "texto": "Ótimo"}],
+            },
+            {
+                "titulo": "Introdução ao Python (2ª edição)",
+                "minutos_necessarios": 60,
+                "comentarios": [{"usuario": "bia", "texto": "Bom"}],
+            },
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "search_term, titles",
+    [
+        ("c++", ["C++ moderno"]),
+        ("(2ª", ["Introdução ao Python (2ª edição)"]),
+        ("java(", []),
+    ],
+)
+def test_search_term_is_matched_literally(df, search_term, titles):
+    assert list(filter_materials(df, search_term=search_term)["titulo"]) == titles
+
+
+def test_sorts_by_scalar_fields(df):
+    assert list(filter_materials(df, sort_column="minutos_necessarios")["titulo"]) == [
+        "Introdução ao Python (2ª edição)",
+        "C++ moderno",
+    ]
+
+
+def test_rejects_fields_that_cannot_be_sorted(df):
+    with pytest.raises(ValueError):
+        filter_materials(df, sort_column="comentarios")
@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+import yaml
+
+from curadoria_coletiva.near_duplicates import NearDuplicateIndex, normalize_url
+from curadoria_coletiva.validate_materials import validate_materials_from_yaml
+
+
+def _material(titulo, autoria="Ana", url=None, file_path="materials/a.yml"):
+    return {
+        "titulo": titulo,
+        "autoria": autoria,
+        "url": url or f"https://example.com/{len(titulo)}",
+        "file_path": file_path,
+    }
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        (
+            "https://example.com/curso?utm_source=x&b=2&fbclid=y&a=1",
+            "https://example.com/curso?a=1&b=2",
+        ),
+        ("http://WWW.Example.com/curso/#aula-1", "https://example.com/curso"),
+        ("https://example.com:443/curso", "https://example.com/curso"),
+        ("http://example.com:80/curso", "https://example.com/curso"),
+        ("https://example.com:8080/curso", "https://example.com:8080/curso"),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_rejects_a_non_numeric_port():
+    with pytest.raises(ValueError, match="Invalid URL"):
+        normalize_url("https://example.com:abc/curso")
+
+
+def test_finds_near_duplicates_through_shared_buckets():
+    index = NearDuplicateIndex()
+    original = _material("Introdução ao Python")
+    index.add(original)
+    index.add(_material("Receitas de bolo", autoria="Caio"))
+
+    near_duplicate = _material("Introducao ao Python!", file_path="materials/b.yml")
+    assert index.find_duplicate(near_duplicate) == "Introdução ao Python"
+    assert index.find_duplicate(_material("Estatística descritiva")) is None
+    # A material is never reported as a duplicate of itself.
+    assert index.find_duplicate(original) is None
+
+
+def test_finds_materials_with_the_same_normalized_url():
+    index = NearDuplicateIndex()
+    index.add(_material("Curso de Git", url="https://www.example.com/git/"))
+
+    other = _material(
+        "Versionamento", autoria="Bia", url="http://example.com/git?utm_medium=x"
+    )
+    assert index.find_duplicate({**other, "file_path": "materials/b.yml"}) == (
+        "Curso de Git"
+    )
+
+
+def test_sync_drops_removed_and_edited_materials():
+    unchanged = _material("Introdução ao Python")
+    edited = _material("Curso de Git", url="https://example.com/git")
+    removed = _material("Receitas de bolo", url="https://example.com/bolo")
+    index = NearDuplicateIndex()
+    for material in [unchanged, edited, removed]:
+        index.add(material)
+
+    edited_now = {**edited, "url": "https://example.com/git-novo"}
+    added = _material("Estatística descritiva")
+    to_check = index.sync([unchanged, edited_now, added])
+
+    assert to_check == [edited_now, added]
+    assert sorted(index.titles.values()) == ["Introdução ao Python"]
+    assert list(index.urls) == [normalize_url(unchanged["url"])]
+    assert all(
+        key in index.signatures for bucket in index.buckets.values() for key in bucket
+    )
+    assert (
+        index.find_duplicate(_material("Receitas de bolo", file_path="b.yml")) is None
+    )
+
+
+def test_saved_index_loads_back(tmp_path):
+    index_file = str(tmp_path / "signatures.json")
+    index = NearDuplicateIndex()
+    index.add(_material("Introdução ao Python"))
+
+    index.save(index_file)
+
+    assert os.listdir(tmp_path) == ["signatures.json"]
+    loaded = NearDuplicateIndex.load(index_file)
+    assert loaded.signatures == index.signatures
+    assert loaded.urls == index.urls
+    assert loaded.buckets == index.buckets
+
+
+def test_validation_only_saves_the_index_when_asked(tmp_path):
+    yaml_file = tmp_path / "all_materials.yml"
+    index_file = tmp_path / "signatures.json"
+    material = {
+        "titulo": "Introdução ao Python",
+        "autoria": "Jane Doe",
+        "url": "https://example.com/python-course",
+        "assuntos": ["python"],
+        "formato": "vídeo",
+        "minutos_necessarios": 90,
+        "ritmo": "médio",
+        "estilo_aprendizagem": "visual",
+        "idioma": "inglês",
+        "nivel_dificuldade": "iniciante",
+        "eh_gratuito": True,
+        "recomendado_por": ["camilamaia"],
+        "file_path": "materials/python.yml",
+    }
+    yaml_file.write_text(yaml.dump([material], allow_unicode=True), encoding="utf-8")
+
+    validate_materials_from_yaml(str(yaml_file), str(index_file))
+    assert not index_file.exists()
+
+    validate_materials_from_yaml(str(yaml_file), str(index_file), update_index=True)
+    with open(index_file, encoding="utf-8") as file:
+        assert json.load(file)["titles"] == {
+            "materials/python.yml::Introdução ao Python": "Introdução ao Python"
+        }
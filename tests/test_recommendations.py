@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+from curadoria_coletiva import recommendations
+from curadoria_coletiva.recommendations import SimilarMaterials, build_similar_materials
+
+
+def _material(
+    titulo,
+    assuntos,
+    formato="vídeo",
+    idioma="português (BR)",
+    nivel="iniciante",
+    recomendado_por=(),
+):
+    return {
+        "titulo": titulo,
+        "assuntos": list(assuntos),
+        "formato": formato,
+        "idioma": idioma,
+        "nivel_dificuldade": nivel,
+        "recomendado_por": list(recomendado_por),
+    }
+
+
+MATERIALS = [
+    _material("Python para iniciantes", ["python"], recomendado_por=["ana"]),
+    _material(
+        "Python para ciência de dados", ["python", "dados"], recomendado_por=["ana"]
+    ),
+    _material("Curso de Python", ["python"], formato="livro"),
+    _material(
+        "Estatística para dados",
+        ["dados", "estatística"],
+        "livro",
+        nivel="intermediário",
+    ),
+    _material("Cozinha italiana", ["culinária"], "livro", "inglês", "avançado"),
+    _material("Cozinha japonesa", ["culinária"], "podcast", "inglês", "avançado"),
+]
+
+
+def _neighbor_titles(similar_materials):
+    return {
+        title: similar_materials.similar(title) for title in similar_materials.titles
+    }
+
+
+def test_similar_materials_are_most_similar_first():
+    similar_materials = SimilarMaterials(MATERIALS)
+
+    # Materials sharing nothing with it, like "Cozinha japonesa", are left out.
+    assert similar_materials.similar("Python para iniciantes") == [
+        "Python para ciência de dados",
+        "Curso de Python",
+        "Estatística para dados",
+    ]
+    assert (np.diff(similar_materials.scores, axis=1) <= 0).all()
+    assert similar_materials.similar("Não existe") == []
+
+
+def test_a_material_is_not_similar_to_itself():
+    similar_materials = SimilarMaterials(MATERIALS)
+
+    for title, similar_titles in _neighbor_titles(similar_materials).items():
+        assert title not in similar_titles
+        assert len(similar_titles) <= recommendations.TOP_K
+
+
+@pytest.mark.parametrize(
+    "added",
+    [
+        _material(
+            "Python avançado", ["python"], nivel="avançado", recomendado_por=["ana"]
+        ),
+        _material(
+            "Introdução à estatística",
+            ["estatística"],
+            "livro",
+            nivel="intermediário",
+            recomendado_por=["bia"],
+        ),
+    ],
+)
+def test_adding_a_material_matches_a_full_rebuild(added):
+    similar_materials = SimilarMaterials(MATERIALS)
+
+    similar_materials.add(added)
+
+    rebuilt = SimilarMaterials(MATERIALS + [added])
+    assert similar_materials.titles == rebuilt.titles
+    assert (similar_materials.neighbors == rebuilt.neighbors).all()
+
+
+def test_empty_catalog_has_no_similar_materials(tmp_path):
+    similar_materials = build_similar_materials([], str(tmp_path / "similar.npz"))
+
+    assert similar_materials.similar("Python para iniciantes") == []
+    similar_materials.add(MATERIALS[0])
+    assert similar_materials.similar(MATERIALS[0]["titulo"]) == []
+
+
+def test_saved_matrix_is_extended_when_a_material_is_added(tmp_path, monkeypatch):
+    state_file = str(tmp_path / "similar.npz")
+    many_materials = MATERIALS + [
+        _material(f"Culinária {i}", ["culinária"]) for i in range(10)
+    ]
+    build_similar_materials(many_materials, state_file)
+    added = _material("Python avançado", ["python"], recomendado_por=["ana"])
+
+    def rebuild(*args, **kwargs):
+        raise AssertionError("the saved matrix should have been reused")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(SimilarMaterials, "_top_neighbors", rebuild)
+        similar_materials = build_similar_materials(
+            [added] + many_materials, state_file
+        )
+
+    assert similar_materials.similar("Python avançado")[0] == "Python para iniciantes"
+    assert SimilarMaterials.load(state_file).titles[-1] == "Python avançado"
+
+
+@pytest.mark.parametrize(
+    "changed_materials",
+    [
+        MATERIALS[1:],
+        [_material("Python para iniciantes", ["python", "dados"])] + MATERIALS[1:],
+        MATERIALS + [_material("Python avançado", ["python"])],
+    ],
+    ids=["removed", "edited", "too many added"],
+)
+def test_saved_matrix_is_rebuilt_otherwise(tmp_path, changed_materials):
+    state_file = str(tmp_path / "similar.npz")
+    build_similar_materials(MATERIALS, state_file)
+
+    similar_materials = build_similar_materials(changed_materials, state_file)
+
+    assert _neighbor_titles(similar_materials) == _neighbor_titles(
+        SimilarMaterials(changed_materials)
+    )
+    assert SimilarMaterials.load(state_file).titles == similar_materials.titles
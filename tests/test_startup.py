@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from curadoria_coletiva.profile_startup import DEFAULT_BUDGET_SECONDS, profile_startup
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported by validation or by what the prebuilt layout already includes, but not
+# needed to serve it.
+DEFERRED_MODULES = [
+    "pydantic",
+    "curadoria_coletiva.material_model",
+    "scipy",
+    "curadoria_coletiva.recommendations",
+]
+
+
+@pytest.fixture(scope="module")
+def prebuilt_layout():
+    """Prebuilds the page layout, as the Docker image does, so the app starts the way
+    it does when deployed."""
+    subprocess.run(
+        [sys.executable, "-m", "curadoria_coletiva.build_layout"],
+        cwd=REPO_DIR,
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_cold_start_is_within_budget(prebuilt_layout, tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_DIR)
+    budget = float(os.environ.get("STARTUP_BUDGET_SECONDS", DEFAULT_BUDGET_SECONDS))
+
+    elapsed = profile_startup(
+        "curadoria_coletiva.app", str(tmp_path / "startup_profile.txt"), budget
+    )
+
+    assert elapsed <= budget
+
+
+def test_cold_start_does_not_import_deferred_modules(prebuilt_layout):
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, curadoria_coletiva.app; "
+            f"print(sorted(m for m in {DEFERRED_MODULES!r} if m in sys.modules))",
+        ],
+        cwd=REPO_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout.splitlines()[-1] == "[]"